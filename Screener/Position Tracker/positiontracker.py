@@ -2,10 +2,17 @@
 Position Tracker - Check where your trades are at NOW
 Reads opportunities_ranked.xlsx and shows current Z-scores for your positions
 """
+import asyncio
+import json
+import os
+import time
+import aiohttp
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import yfinance as yf
 import numpy as np
 from datetime import date, timedelta
+from pathlib import Path
 
 # ============================================================================
 # YOUR POSITIONS - Edit this list
@@ -21,38 +28,292 @@ MY_POSITIONS = [
 
 OPPORTUNITIES_FILE = "/Users/jazzhashzzz/Documents/Market_Analysis_files/output/screener/opportunities_ranked.xlsx"
 
+# Position status labels (set and filtered by exact match)
+STATUS_IMPROVING = "📈 IMPROVING"
+STATUS_WORSENING = "📉 WORSENING"
+STATUS_FLAT = "➡️ FLAT"
+STATUS_NEW = "❓ NEW"
+
+# On-disk history cache - re-runs within the TTL skip the network entirely
+CACHE_DIR = Path.home() / ".cache" / "positiontracker"
+CACHE_TTL_INTRADAY = 4 * 3600       # Seconds, for today's (still moving) bars
+CACHE_TTL_HISTORICAL = 24 * 3600    # Seconds, for completed sessions
+
+# Rolling Z-score state carried between daily runs (adjusted closes)
+STATE_FILE = CACHE_DIR / "positions_state_adj.json"
+
+# Fallback endpoint for tickers missing from the batched download
+CHART_URL = "https://query1.finance.yahoo.com/v8/finance/chart/{ticker}?range=110d&interval=1d"
+
 # ============================================================================
 # QUICK Z-SCORE CALCULATOR
 # ============================================================================
 
-def get_current_z_score(ticker, lookback_days=60):
-    """Get live Z-score right now"""
+def _cache_path(ticker, start_date, end_date):
+    return CACHE_DIR / f"{ticker}_{start_date}_{end_date}_adj.parquet"
+
+
+def _cached_history(ticker, start_date, end_date):
+    """Return cached history for ticker if the cache file is still fresh"""
+    path = _cache_path(ticker, start_date, end_date)
+    ttl = CACHE_TTL_INTRADAY if end_date >= date.today() else CACHE_TTL_HISTORICAL
+    
     try:
-        end_date = date.today()
-        start_date = end_date - timedelta(days=lookback_days + 50)
-        
-        hist_data = yf.download(ticker, start=start_date, end=end_date, progress=False, timeout=10)
-        
-        if hist_data is None or len(hist_data) < 30:
-            return None
-        
-        actual_lookback = min(lookback_days, len(hist_data))
-        recent_data = hist_data.tail(actual_lookback)
-        
-        rolling_mean = float(recent_data['Close'].mean())
-        rolling_std = float(recent_data['Close'].std())
-        current_price = float(recent_data['Close'].iloc[-1])
+        if time.time() - os.stat(path).st_mtime < ttl:
+            return pd.read_parquet(path)
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _store_history(ticker, start_date, end_date, history):
+    """Write ticker history to the cache, ignoring disk errors"""
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        history.to_parquet(_cache_path(ticker, start_date, end_date), compression='zstd')
+    except (OSError, ValueError, ImportError):
+        pass
+
+
+def last_session_date():
+    """Most recent completed weekday session (downloads end before today)"""
+    return (pd.Timestamp(date.today()) - pd.offsets.BDay(1)).date()
+
+
+def default_start_date(lookback_days=60):
+    """Start of the full download window (lookback plus a calendar buffer)"""
+    return date.today() - timedelta(days=lookback_days + 50)
+
+
+def download_history(tickers, lookback_days=60, start_date=None):
+    """Download history for all tickers in one batched request, cache first"""
+    end_date = date.today()
+    if start_date is None:
+        start_date = default_start_date(lookback_days)
+    
+    frames = {}
+    for ticker in tickers:
+        cached = _cached_history(ticker, start_date, end_date)
+        if cached is not None:
+            frames[ticker] = cached
+    
+    missing = [t for t in tickers if t not in frames]
+    if missing:
+        hist_panel = yf.download(
+            tickers=" ".join(missing),
+            start=start_date,
+            end=end_date,
+            group_by='ticker',
+            threads=True,
+            auto_adjust=True,      # Adjusted closes, same as the screener's original_z
+            progress=False,
+            timeout=10
+        )
         
-        if rolling_std > 0:
-            z_score = (current_price - rolling_mean) / rolling_std
-            return {
-                'current_price': current_price,
-                'z_score': z_score,
-                'rolling_mean': rolling_mean
-            }
+        if hist_panel is not None and len(hist_panel) > 0:
+            # Older yfinance returns flat columns for a single ticker
+            if not isinstance(hist_panel.columns, pd.MultiIndex):
+                hist_panel = pd.concat({missing[0]: hist_panel}, axis=1)
+            
+            for ticker in hist_panel.columns.get_level_values(0).unique():
+                history = hist_panel[ticker].dropna(how='all')
+                if len(history) > 0:
+                    _store_history(ticker, start_date, end_date, history)
+                    frames[ticker] = history
+    
+    if not frames:
         return None
-    except:
+    return pd.concat(frames, axis=1)
+
+
+def z_score_from_closes(closes, lookback_days=60):
+    """Z-score from a plain array of daily closes"""
+    if closes is None or len(closes) < 30:
         return None
+    
+    recent = closes[-lookback_days:]
+    rolling_mean = recent.mean()
+    rolling_std = recent.std(ddof=1)
+    current_price = closes[-1]
+    
+    if rolling_std > 0:
+        return {
+            'current_price': float(current_price),
+            'z_score': float((current_price - rolling_mean) / rolling_std),
+            'rolling_mean': float(rolling_mean)
+        }
+    return None
+
+
+# ============================================================================
+# INCREMENTAL ROLLING STATS (Welford)
+# ============================================================================
+# Each ticker keeps (n, mean, M2) over its last lookback_days closes plus the
+# window itself, so a daily re-run only downloads and folds in the new bars.
+
+def load_state():
+    """Load per-ticker rolling stats from disk"""
+    try:
+        with open(STATE_FILE, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(state):
+    """Persist per-ticker rolling stats, ignoring disk errors"""
+    try:
+        STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with open(STATE_FILE, 'w') as f:
+            json.dump(state, f)
+    except OSError:
+        pass
+
+
+def _welford_add(entry, x):
+    entry['n'] += 1
+    delta = x - entry['mean']
+    entry['mean'] += delta / entry['n']
+    entry['M2'] += delta * (x - entry['mean'])
+
+
+def _welford_remove(entry, x):
+    entry['n'] -= 1
+    delta = x - entry['mean']
+    entry['mean'] -= delta / entry['n']
+    entry['M2'] -= delta * (x - entry['mean'])
+
+
+def incremental_start_date(state, tickers, lookback_days=60):
+    """Earliest date the next download needs to cover for these tickers"""
+    full_start = default_start_date(lookback_days)
+    last_dates = [state[t]['last_date'] for t in tickers if t in state]
+    
+    if len(last_dates) < len(tickers):
+        return full_start
+    
+    next_day = date.fromisoformat(min(last_dates)) + timedelta(days=1)
+    return max(next_day, full_start)
+
+
+def _z_score_from_entry(entry):
+    """Z-score of the newest close against the entry's rolling window"""
+    rolling_std = float(np.sqrt(entry['M2'] / (entry['n'] - 1))) if entry['n'] > 1 else 0.0
+    current_price = entry['window'][-1]
+    
+    if rolling_std > 0:
+        return {
+            'current_price': current_price,
+            'z_score': (current_price - entry['mean']) / rolling_std,
+            'rolling_mean': entry['mean']
+        }
+    return None
+
+
+def update_z_scores(state, hist_panel, tickers, lookback_days=60):
+    """
+    Fold new closes into each ticker's rolling window, return Z-scores
+    hist_panel may be None (download skipped or failed) - state that already
+    covers the last session is still current; anything older comes back None
+    """
+    full_start = default_start_date(lookback_days).isoformat()
+    last_session = last_session_date().isoformat()
+    z_scores = {}
+    
+    for ticker in tickers:
+        try:
+            entry = state.get(ticker)
+            
+            # Stale state would leave a gap in the window - reseed instead
+            if entry is not None and entry['last_date'] < full_start:
+                entry = None
+            
+            if hist_panel is not None and ticker in hist_panel.columns.get_level_values(0):
+                closes = hist_panel[ticker]['Close'].dropna()
+            else:
+                closes = pd.Series(dtype=np.float64, index=pd.DatetimeIndex([]))
+            
+            if entry is None:
+                # Seed from the full window
+                if len(closes) < 30:
+                    z_scores[ticker] = None
+                    state.pop(ticker, None)
+                    continue
+                closes = closes.tail(lookback_days)
+                entry = {'n': 0, 'mean': 0.0, 'M2': 0.0, 'window': [], 'last_date': None}
+            else:
+                closes = closes[closes.index > pd.Timestamp(entry['last_date'])]
+                
+                if len(closes) == 0:
+                    # No new bars: current if the state already has the last session,
+                    # otherwise the download missed this ticker - don't report stale data
+                    up_to_date = entry['last_date'] >= last_session
+                    z_scores[ticker] = _z_score_from_entry(entry) if up_to_date else None
+                    continue
+            
+            # O(1) per new bar: add the new close, drop the oldest
+            for x in closes.to_numpy(dtype=np.float64):
+                x = float(x)
+                entry['window'].append(x)
+                _welford_add(entry, x)
+                if entry['n'] > lookback_days:
+                    _welford_remove(entry, entry['window'].pop(0))
+            
+            entry['last_date'] = closes.index[-1].date().isoformat()
+            state[ticker] = entry
+            z_scores[ticker] = _z_score_from_entry(entry)
+        except (KeyError, TypeError, ValueError, IndexError):
+            # Malformed state entry or price frame - drop it so the next run reseeds
+            state.pop(ticker, None)
+            z_scores[ticker] = None
+    
+    return z_scores
+
+
+async def fetch(session, ticker):
+    """Fetch daily closes for one ticker straight from the Yahoo chart API"""
+    try:
+        async with session.get(CHART_URL.format(ticker=ticker)) as response:
+            payload = await response.json()
+        
+        # Adjusted closes of completed sessions - same series as download_history
+        result = payload['chart']['result'][0]
+        closes = np.array(result['indicators']['adjclose'][0]['adjclose'], dtype=np.float64)
+        sessions = pd.to_datetime(result['timestamp'], unit='s', utc=True).tz_convert(
+            result['meta']['exchangeTimezoneName']
+        ).date
+        return ticker, closes[(sessions < date.today()) & ~np.isnan(closes)]
+    except (aiohttp.ClientError, asyncio.TimeoutError, KeyError, IndexError, TypeError, ValueError):
+        return ticker, None
+
+
+async def fetch_all(tickers):
+    """Fetch all tickers concurrently over one pooled session"""
+    connector = aiohttp.TCPConnector(limit=16, keepalive_timeout=30)
+    timeout = aiohttp.ClientTimeout(total=10)
+    headers = {'User-Agent': 'Mozilla/5.0'}
+    
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=headers) as session:
+        responses = await asyncio.gather(*(fetch(session, t) for t in tickers))
+    
+    return dict(responses)
+
+def load_strong_setups(excel_path):
+    """Load the analyzer's strong setups, preferring its current parquet twin"""
+    parquet_path = Path(excel_path).with_suffix('.parquet')
+    
+    if parquet_path.exists() and (
+        not Path(excel_path).exists()
+        or parquet_path.stat().st_mtime >= Path(excel_path).stat().st_mtime
+    ):
+        ranked = pd.read_parquet(parquet_path)
+        return ranked[ranked['tier'] == 'STRONG']
+    
+    # Rust-backed calamine reader; openpyxl if python-calamine is missing
+    try:
+        return pd.read_excel(excel_path, sheet_name='Strong Setups', engine='calamine')
+    except (ImportError, ValueError):
+        return pd.read_excel(excel_path, sheet_name='Strong Setups')
 
 # ============================================================================
 # MAIN
@@ -63,19 +324,50 @@ def main():
     print("POSITION TRACKER - Where Are My Trades At?")
     print("="*80)
     
-    # Load original opportunities
-    print(f"\nLoading: {OPPORTUNITIES_FILE}")
-    df_original = pd.read_excel(OPPORTUNITIES_FILE, sheet_name='Strong Setups')
+    state = load_state()
+    start_date = incremental_start_date(state, MY_POSITIONS)
     
-    print(f"\nChecking {len(MY_POSITIONS)} positions...\n")
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        # Start the network fetch, then read the (slow) Excel file while it runs
+        # Nothing to fetch if the state already covers every completed session
+        if start_date <= last_session_date():
+            download = executor.submit(download_history, MY_POSITIONS, start_date=start_date)
+        else:
+            download = None
+        
+        # Load original opportunities
+        print(f"\nLoading: {OPPORTUNITIES_FILE}")
+        df_original = load_strong_setups(OPPORTUNITIES_FILE)
+        
+        print(f"\nChecking {len(MY_POSITIONS)} positions...\n")
+        
+        # Get current Z-scores (one batched download for all positions)
+        print(f"Fetching {len(MY_POSITIONS)} tickers...", end=" ", flush=True)
+        try:
+            hist_panel = download.result() if download is not None else None
+        except Exception:
+            hist_panel = None
+    
+    currents = update_z_scores(state, hist_panel, MY_POSITIONS)
+    save_state(state)
+    print("✓ Done")
+    
+    # Retry anything the batch missed concurrently against the chart API
+    missing = [t for t in MY_POSITIONS if currents.get(t) is None]
+    if missing:
+        print(f"Retrying {len(missing)} tickers...", end=" ", flush=True)
+        fallback = asyncio.run(fetch_all(missing))
+        for ticker, closes in fallback.items():
+            currents[ticker] = z_score_from_closes(closes)
+        print("✓ Done")
+    print()
     
     results = []
     
     for ticker in MY_POSITIONS:
-        print(f"Fetching {ticker}...", end=" ", flush=True)
+        print(f"{ticker}...", end=" ", flush=True)
         
-        # Get current Z-score
-        current = get_current_z_score(ticker)
+        current = currents.get(ticker)
         
         if current is None:
             print("✗ Failed")
@@ -99,17 +391,17 @@ def main():
             
             # Determine status
             if z_change > 0.5:
-                status = "📈 IMPROVING"
+                status = STATUS_IMPROVING
                 status_color = "Mean reversion working"
             elif z_change < -0.5:
-                status = "📉 WORSENING"
+                status = STATUS_WORSENING
                 status_color = "Getting more oversold"
             else:
-                status = "➡️ FLAT"
+                status = STATUS_FLAT
                 status_color = "No change"
         else:
             z_change = None
-            status = "❓ NEW"
+            status = STATUS_NEW
             status_color = "Not in original screener"
         
         results.append({
@@ -131,9 +423,7 @@ def main():
     print("CURRENT STATUS")
     print("="*80)
     
-    df_results = pd.DataFrame(results)
-    
-    for _, row in df_results.iterrows():
+    for row in results:
         print(f"\n{row['ticker']} ({row['sector']})")
         print(f"  Current Price: ${row['current_price']:.2f}")
         print(f"  Current Z-Score: {row['current_z']:.2f}")
@@ -151,21 +441,25 @@ def main():
     print("SUMMARY")
     print("="*80)
     
-    improving = df_results[df_results['status'].str.contains('IMPROVING')]
-    worsening = df_results[df_results['status'].str.contains('WORSENING')]
-    flat = df_results[df_results['status'].str.contains('FLAT')]
+    # Bucket by status in a single pass
+    buckets = {STATUS_IMPROVING: [], STATUS_WORSENING: [], STATUS_FLAT: [], STATUS_NEW: []}
+    for r in results:
+        buckets[r['status']].append(r)
+    improving = buckets[STATUS_IMPROVING]
+    worsening = buckets[STATUS_WORSENING]
+    flat = buckets[STATUS_FLAT]
     
     print(f"\n📈 Improving (mean reversion working): {len(improving)}")
     if len(improving) > 0:
-        print(f"   {', '.join(improving['ticker'].values)}")
+        print(f"   {', '.join(r['ticker'] for r in improving)}")
     
     print(f"\n📉 Worsening (getting more oversold): {len(worsening)}")
     if len(worsening) > 0:
-        print(f"   {', '.join(worsening['ticker'].values)}")
+        print(f"   {', '.join(r['ticker'] for r in worsening)}")
     
     print(f"\n➡️ Flat (no major change): {len(flat)}")
     if len(flat) > 0:
-        print(f"   {', '.join(flat['ticker'].values)}")
+        print(f"   {', '.join(r['ticker'] for r in flat)}")
     
     # Recommendations
     print("\n" + "="*80)
@@ -173,14 +467,14 @@ def main():
     print("="*80)
     
     print("\nGood signs (Z-score improving toward 0):")
-    for _, row in improving.iterrows():
+    for row in improving:
         if row['current_z'] > -2.0:
             print(f"  ✅ {row['ticker']}: Z went from {row['original_z']:.2f} → {row['current_z']:.2f} (close to mean)")
         else:
             print(f"  🟡 {row['ticker']}: Z went from {row['original_z']:.2f} → {row['current_z']:.2f} (improving but still oversold)")
     
     print("\nConcern (Z-score getting worse):")
-    for _, row in worsening.iterrows():
+    for row in worsening:
         print(f"  ⚠️ {row['ticker']}: Z went from {row['original_z']:.2f} → {row['current_z']:.2f} (structural issue?)")
     
     print("\n" + "="*80)
@@ -2,8 +2,10 @@
 Standalone Excel Analyzer - Identifies Best Mean Reversion Opportunities
 Reads screening results and scores based on valuation + statistical dislocation
 """
+import numpy as np
 import pandas as pd
 import sys
+import xlsxwriter
 from pathlib import Path
 
 # ============================================================================
@@ -42,117 +44,137 @@ CRITERIA = {
     }
 }
 
+# CRITERIA as parallel arrays (one slot per metric) for the vectorized scorer
+METRIC_NAMES = np.array(list(CRITERIA))
+OPT_MIN = np.array([CRITERIA[m]['optimal_range'][0] for m in METRIC_NAMES], dtype=np.float64)
+OPT_MAX = np.array([CRITERIA[m]['optimal_range'][1] for m in METRIC_NAMES], dtype=np.float64)
+ACC_MIN = np.array([CRITERIA[m]['acceptable_range'][0] for m in METRIC_NAMES], dtype=np.float64)
+ACC_MAX = np.array([CRITERIA[m]['acceptable_range'][1] for m in METRIC_NAMES], dtype=np.float64)
+WEIGHTS = np.array([CRITERIA[m]['weight'] for m in METRIC_NAMES], dtype=np.float64)
+
+# Tier boundaries on opportunity_score
+TIER_EDGES = np.array([50, 70])
+TIER_LABELS = np.array(['PASS', 'REVIEW', 'STRONG'])
+
 # ============================================================================
 # SCORING FUNCTIONS
 # ============================================================================
 
-def score_metric(value, optimal_range, acceptable_range):
+def score_metric(values, optimal_range, acceptable_range):
     """
-    Score a metric from 0-100
+    Score metric values from 0-100 (vectorized; ranges may be per-column arrays)
     100 = in optimal range
     50 = in acceptable range but not optimal
-    0 = outside acceptable range
+    0 = outside acceptable range (or missing)
     """
-    if pd.isna(value):
-        return 0
-    
     opt_min, opt_max = optimal_range
     acc_min, acc_max = acceptable_range
     
-    # Perfect score if in optimal range
-    if opt_min <= value <= opt_max:
-        return 100
-    
-    # Partial score if in acceptable range
-    if acc_min <= value <= acc_max:
-        # Linear decay from optimal to acceptable boundary
-        if value < opt_min:
-            distance = opt_min - value
-            max_distance = opt_min - acc_min
-        else:
-            distance = value - opt_max
-            max_distance = acc_max - opt_max
-        
-        return 100 - (distance / max_distance * 50)
+    # NaN fails every comparison, so missing values fall through to 0
+    in_optimal = (values >= opt_min) & (values <= opt_max)
+    in_acceptable = (values >= acc_min) & (values <= acc_max)
+    
+    # Linear decay from optimal to acceptable boundary
+    below = values < opt_min
+    distance = np.where(below, opt_min - values, values - opt_max)
+    max_distance = np.where(below, opt_min - acc_min, acc_max - opt_max)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        partial = 100 - (distance / max_distance * 50)
     
-    # Zero if outside acceptable range
-    return 0
+    return np.where(in_optimal, 100.0, np.where(in_acceptable, partial, 0.0))
 
 
-def calculate_composite_score(row):
-    """Calculate weighted composite score for a stock"""
-    total_score = 0
-    total_weight = 0
-    
-    for metric, params in CRITERIA.items():
-        if metric in row.index:
-            value = row[metric]
-            score = score_metric(
-                value,
-                params['optimal_range'],
-                params['acceptable_range']
-            )
-            weighted_score = score * params['weight']
-            total_score += weighted_score
-            total_weight += params['weight']
-    
-    # Normalize to 0-100
-    if total_weight > 0:
-        return total_score / total_weight
-    return 0
+def calculate_composite_scores(df):
+    """Calculate weighted composite score for every stock at once"""
+    present = np.isin(METRIC_NAMES, df.columns)
+    if not present.any():
+        return np.zeros(len(df))
+    
+    # (stocks x metrics) matrix scored against per-metric bound vectors
+    values = df[list(METRIC_NAMES[present])].to_numpy(dtype=np.float64, na_value=np.nan)
+    scores = score_metric(
+        values,
+        (OPT_MIN[present], OPT_MAX[present]),
+        (ACC_MIN[present], ACC_MAX[present])
+    )
+    
+    # Weighted average, normalized to 0-100
+    weights = WEIGHTS[present]
+    return scores @ weights / weights.sum()
 
 
 def apply_quality_filters(df):
     """Apply hard filters to remove junk"""
-    filtered = df.copy()
-    
-    # Filter 1: Must have P/E data and be profitable
-    filtered = filtered[filtered['pe_ratio'].notna()]
-    filtered = filtered[filtered['pe_ratio'] > 0]
+    mask = (
+        # Filter 1: Must have P/E data and be profitable
+        df['pe_ratio'].notna() & (df['pe_ratio'] > 0) &
+        
+        # Filter 2: Must have Z-score data
+        df['z_score'].notna() &
+        
+        # Filter 3: Must be oversold (Z < -1.5)
+        (df['z_score'] < -1.5) &
+        
+        # Filter 4: Not completely broken (drop < -70%)
+        (df['drop_from_high_pct'] > -70) &
+        
+        # Filter 5: Has reasonable volume data
+        df['avg_volume'].notna() & (df['avg_volume'] > 500_000) &
+        
+        # Filter 6: Volatility not insane (< 150%)
+        (df['volatility'] < 150)
+    )
     
-    # Filter 2: Must have Z-score data
-    filtered = filtered[filtered['z_score'].notna()]
+    # Single slice instead of one intermediate copy per filter
+    filtered = df.loc[mask].copy()
     
-    # Filter 3: Must be oversold (Z < -1.5)
-    filtered = filtered[filtered['z_score'] < -1.5]
+    # Add earnings risk flag
+    filtered['earnings_risk'] = flag_earnings(filtered)
     
-    # Filter 4: Not completely broken (drop < -70%)
-    filtered = filtered[filtered['drop_from_high_pct'] > -70]
+    return filtered
+
+
+def flag_earnings(df):
+    """Earnings risk label per row, built from whole-column masks"""
+    if 'days_to_earnings' not in df.columns:
+        return np.full(len(df), '', dtype=object)
     
-    # Filter 5: Has reasonable volume data
-    filtered = filtered[filtered['avg_volume'].notna()]
-    filtered = filtered[filtered['avg_volume'] > 500_000]
+    days = df['days_to_earnings'].to_numpy(dtype=np.float64, na_value=np.nan)
+    upcoming = (days >= 0) & (days <= 7)
+    reported = (days >= -7) & (days < 0)
     
-    # Filter 6: Volatility not insane (< 150%)
-    filtered = filtered[filtered['volatility'] < 150]
+    upcoming_days = np.where(upcoming, days, 0).astype(int).astype(str)
+    upcoming_msg = np.char.add('⚠️ ', np.char.add(upcoming_days, 'd to earnings'))
     
-    # Add earnings risk flag
-    def flag_earnings(row):
-        if 'days_to_earnings' in row.index and pd.notna(row['days_to_earnings']):
-            days = row['days_to_earnings']
-            if 0 <= days <= 7:
-                return f'⚠️ {days}d to earnings'
-            elif -7 <= days < 0:
-                return f'Just reported'
-        return ''
+    return np.select([upcoming, reported], [upcoming_msg, 'Just reported'], default='')
+
+
+def top_n(df, column, n):
+    """Top n rows by column (descending) without sorting the whole frame"""
+    values = df[column].to_numpy()
     
-    filtered['earnings_risk'] = filtered.apply(flag_earnings, axis=1)
+    if len(values) > n:
+        idx = np.argpartition(-values, n)[:n]
+    else:
+        idx = np.arange(len(values))
     
-    return filtered
+    idx = idx[np.argsort(-values[idx], kind='stable')]
+    return df.iloc[idx]
 
 
 def detect_sector_clustering(df, max_per_sector=3):
     """Flag tickers if too many from same sector"""
-    sector_counts = df['sector'].value_counts()
+    # One hashing pass: factorize to codes, count codes, gather back per row
+    # (missing sectors get code -1, which picks up the trailing zero count)
+    codes, sectors = pd.factorize(df['sector'])
+    sector_counts = np.bincount(codes[codes >= 0], minlength=len(sectors))
+    counts = np.append(sector_counts, 0)[codes]
     
-    def flag_cluster(row):
-        if row['sector'] in sector_counts.index:
-            count = sector_counts[row['sector']]
-            if count > max_per_sector:
-                return f'⚠ {count} signals in sector'
-        return ''
+    clustered = counts > max_per_sector
+    cluster_counts = np.where(clustered, counts, 0).astype(str)
+    cluster_msg = np.char.add('⚠ ', np.char.add(cluster_counts, ' signals in sector'))
     
-    df['sector_cluster_risk'] = df.apply(flag_cluster, axis=1)
+    df['sector_cluster_risk'] = np.select([clustered], [cluster_msg], default='')
     return df
 
 
@@ -160,6 +182,35 @@ def detect_sector_clustering(df, max_per_sector=3):
 # ANALYSIS
 # ============================================================================
 
+def _write_sheet(workbook, sheet_name, df):
+    """Write header + rows in order (constant_memory only keeps one row open)"""
+    ws = workbook.add_worksheet(sheet_name)
+    ws.write_row(0, 0, list(df.columns))
+    
+    # Blank cells for missing values, like DataFrame.to_excel
+    # +-inf too (e.g. yfinance's 'Infinity' P/E) - spreadsheet cells can't hold it
+    values = df.astype(object).where(df.notna() & ~df.isin([np.inf, -np.inf]), None)
+    for i, row in enumerate(values.itertuples(index=False), 1):
+        ws.write_row(i, 0, row)
+
+
+def load_results(excel_path, sheet_name):
+    """Load results from the parquet twin if it is current, else from Excel"""
+    parquet_path = Path(excel_path).with_suffix('.parquet')
+    
+    if parquet_path.exists() and (
+        not Path(excel_path).exists()
+        or parquet_path.stat().st_mtime >= Path(excel_path).stat().st_mtime
+    ):
+        return pd.read_parquet(parquet_path)
+    
+    # Rust-backed calamine reader; openpyxl if python-calamine is missing
+    try:
+        return pd.read_excel(excel_path, sheet_name=sheet_name, engine='calamine')
+    except (ImportError, ValueError):
+        return pd.read_excel(excel_path, sheet_name=sheet_name)
+
+
 def analyze_opportunities(input_file, output_file):
     """Main analysis function"""
     
@@ -169,7 +220,7 @@ def analyze_opportunities(input_file, output_file):
     
     # Load data
     print(f"\nLoading: {input_file}")
-    df = pd.read_excel(input_file, sheet_name='All Results')
+    df = load_results(input_file, 'All Results')
     print(f"Loaded {len(df)} stocks")
     
     # Apply quality filters
@@ -177,25 +228,27 @@ def analyze_opportunities(input_file, output_file):
     df_filtered = apply_quality_filters(df)
     print(f"  → {len(df_filtered)} passed filters")
     
+    # Low-cardinality label column - integer codes for groupby/compare
+    df_filtered['sector'] = df_filtered['sector'].astype('category')
+    
     if len(df_filtered) == 0:
         print("\nNo stocks passed quality filters!")
         return
     
     # Calculate composite scores
     print("\nCalculating opportunity scores...")
-    df_filtered['opportunity_score'] = df_filtered.apply(calculate_composite_score, axis=1)
-    
-    # Sort by score
-    df_filtered = df_filtered.sort_values('opportunity_score', ascending=False)
+    df_filtered['opportunity_score'] = calculate_composite_scores(df_filtered)
     
     # Add sector clustering risk
     df_filtered = detect_sector_clustering(df_filtered)
     
     # Categorize opportunities
-    df_filtered['tier'] = pd.cut(
-        df_filtered['opportunity_score'],
-        bins=[0, 50, 70, 100],
-        labels=['PASS', 'REVIEW', 'STRONG']
+    # (0, 50] PASS, (50, 70] REVIEW, (70, 100] STRONG
+    scores = df_filtered['opportunity_score'].to_numpy()
+    df_filtered['tier'] = pd.Categorical(
+        TIER_LABELS[np.searchsorted(TIER_EDGES, scores)],
+        categories=TIER_LABELS,
+        ordered=False
     )
     
     # ========================================================================
@@ -207,7 +260,7 @@ def analyze_opportunities(input_file, output_file):
     print("="*80)
     
     # Show top 20
-    top_20 = df_filtered.head(20)
+    top_20 = top_n(df_filtered, 'opportunity_score', 20)
     
     display_cols = [
         'ticker',
@@ -231,14 +284,15 @@ def analyze_opportunities(input_file, output_file):
     print("SUMMARY")
     print("="*80)
     
+    tier_counts = df_filtered['tier'].value_counts()
     print(f"\nTotal opportunities: {len(df_filtered)}")
-    print(f"  STRONG (>70):  {len(df_filtered[df_filtered['tier'] == 'STRONG'])}")
-    print(f"  REVIEW (50-70): {len(df_filtered[df_filtered['tier'] == 'REVIEW'])}")
-    print(f"  PASS (<50):     {len(df_filtered[df_filtered['tier'] == 'PASS'])}")
+    print(f"  STRONG (>70):  {tier_counts.get('STRONG', 0)}")
+    print(f"  REVIEW (50-70): {tier_counts.get('REVIEW', 0)}")
+    print(f"  PASS (<50):     {tier_counts.get('PASS', 0)}")
     
     # Sector breakdown
     print("\nBy Sector:")
-    sector_summary = df_filtered.groupby('sector').agg({
+    sector_summary = df_filtered.groupby('sector', observed=True).agg({
         'ticker': 'count',
         'opportunity_score': 'mean'
     }).sort_values('opportunity_score', ascending=False)
@@ -277,19 +331,33 @@ def analyze_opportunities(input_file, output_file):
         'signal',
     ]
     
-    output_df = df_filtered[output_cols]
+    # Full sort only for the ranked sheet
+    output_df = df_filtered.sort_values('opportunity_score', ascending=False)[output_cols]
     
-    with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
-        # Sheet 1: All ranked opportunities
-        output_df.to_excel(writer, sheet_name='Ranked Opportunities', index=False)
-        
-        # Sheet 2: Strong only (>70 score)
-        strong = output_df[output_df['tier'] == 'STRONG']
-        if len(strong) > 0:
-            strong.to_excel(writer, sheet_name='Strong Setups', index=False)
-        
-        # Sheet 3: By sector
-        sector_summary.to_excel(writer, sheet_name='Sector Summary')
+    # Stream rows to disk (constant_memory) - each sheet written top to bottom
+    workbook = xlsxwriter.Workbook(output_file, {
+        'constant_memory': True,
+        'default_date_format': 'yyyy-mm-dd hh:mm:ss'
+    })
+    
+    # Sheet 1: All ranked opportunities
+    _write_sheet(workbook, 'Ranked Opportunities', output_df)
+    
+    # Sheet 2: Strong only (>70 score)
+    strong = output_df[output_df['tier'] == 'STRONG']
+    if len(strong) > 0:
+        _write_sheet(workbook, 'Strong Setups', strong)
+    
+    # Sheet 3: By sector
+    _write_sheet(workbook, 'Sector Summary', sector_summary.reset_index())
+    
+    workbook.close()
+    
+    # Parquet twin of the ranked sheet for the position tracker
+    try:
+        output_df.to_parquet(Path(output_file).with_suffix('.parquet'), index=False, compression='zstd')
+    except Exception as e:
+        print(f"Warning: Parquet copy not written: {e}")
     
     print(f"\nSaved to: {output_file}")
     print("\nSheets created:")
@@ -320,7 +388,7 @@ if __name__ == "__main__":
         input_file = INPUT_FILE
     
     # Check if file exists
-    if not Path(input_file).exists():
+    if not Path(input_file).exists() and not Path(input_file).with_suffix('.parquet').exists():
         print(f"\nERROR: File not found: {input_file}")
         print("\nUsage:")
         print(f"  python {Path(__file__).name} [path/to/excel_file.xlsx]")
@@ -0,0 +1,75 @@
+"""On-disk TTL cache for yfinance responses - re-runs skip the network"""
+import json
+import os
+import time
+from pathlib import Path
+
+import pandas as pd
+
+CACHE_DIR = Path.home() / ".cache" / "screener"
+TTL_INFO = 24 * 3600      # Seconds, for .info fundamentals
+TTL_PRICES = 3600         # Seconds, for price windows that include today
+
+
+class FileCache:
+    """
+    Per-ticker file cache stored as {root}/{ticker}/{endpoint}.json|.parquet
+    JSON payloads carry their own timestamp; DataFrames use file mtime
+    Disk errors are treated as a miss so the caller just hits the network
+    """
+
+    def __init__(self, root=CACHE_DIR):
+        self.root = Path(root)
+
+    def _path(self, ticker, endpoint, suffix):
+        return self.root / ticker / f"{endpoint}{suffix}"
+
+    def _write(self, path, write):
+        # Write to a temp file then rename, so concurrent readers never see half a file
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{time.monotonic_ns()}.tmp")
+        write(tmp)
+        os.replace(tmp, path)
+
+    def get(self, ticker, endpoint, ttl=TTL_INFO):
+        """Return the cached JSON payload, or None if missing or expired"""
+        try:
+            with open(self._path(ticker, endpoint, '.json'), 'r') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if time.time() - entry.get('timestamp', 0) >= ttl:
+            return None
+        return entry.get('data')
+
+    def set(self, ticker, endpoint, data):
+        """Store a JSON-serializable payload (dates are written as strings)"""
+        entry = {'timestamp': time.time(), 'data': data}
+
+        def write(tmp):
+            with open(tmp, 'w') as f:
+                json.dump(entry, f, default=str)
+
+        try:
+            self._write(self._path(ticker, endpoint, '.json'), write)
+        except (OSError, TypeError, ValueError):
+            pass
+
+    def get_frame(self, ticker, endpoint, ttl=TTL_PRICES):
+        """Return the cached DataFrame, or None if missing or expired"""
+        path = self._path(ticker, endpoint, '.parquet')
+        try:
+            if time.time() - os.stat(path).st_mtime < ttl:
+                return pd.read_parquet(path)
+        except (OSError, ValueError, ImportError):
+            pass
+        return None
+
+    def set_frame(self, ticker, endpoint, df):
+        """Store a DataFrame as parquet"""
+        try:
+            self._write(self._path(ticker, endpoint, '.parquet'),
+                        lambda tmp: df.to_parquet(tmp, compression='zstd'))
+        except (OSError, ValueError, ImportError):
+            pass
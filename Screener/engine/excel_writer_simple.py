@@ -1,20 +1,37 @@
 """Excel output - enhanced with P/E and Z-score columns"""
+import numpy as np
 import pandas as pd
+from openpyxl import Workbook
 from pathlib import Path
 
+
+def _append_sheet(wb, sheet_name, df):
+    """Stream a DataFrame into a new write-only sheet (header + rows)"""
+    ws = wb.create_sheet(sheet_name)
+    ws.append(list(df.columns))
+    
+    # Blank cells for missing values, like DataFrame.to_excel
+    # +-inf too (e.g. yfinance's 'Infinity' P/E) - spreadsheet cells can't hold it
+    values = df.astype(object).where(df.notna() & ~df.isin([np.inf, -np.inf]), None)
+    for row in values.itertuples(index=False):
+        ws.append(list(row))
+
+
 def write_results_to_excel(results, output_path):
     """
     Write screening results to Excel
     Now includes P/E, sector, and Z-score for mean reversion
+    results: list of result dicts, or a DataFrame of successful results
     """
     # Create output directory if it doesn't exist
     output_dir = Path(output_path).parent
     output_dir.mkdir(parents=True, exist_ok=True)
     
-    df = pd.DataFrame(results)
+    df = results if isinstance(results, pd.DataFrame) else pd.DataFrame(results)
     
     # Filter successful results
-    df = df[df['success'] == True].copy()
+    if 'success' in df.columns:
+        df = df[df['success'] == True].copy()
     
     if len(df) == 0:
         print("No successful results to save")
@@ -48,20 +65,30 @@ def write_results_to_excel(results, output_path):
     available_cols = [col for col in column_order if col in df.columns]
     df = df[available_cols]
     
-    # Write to Excel
-    with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-        # Main sheet
-        df.to_excel(writer, index=False, sheet_name='All Results')
-        
-        # Sheet 2: Oversold opportunities (Z < -2)
-        oversold = df[df['signal'] == 'OVERSOLD'].copy()
-        if len(oversold) > 0:
-            oversold.to_excel(writer, index=False, sheet_name='Oversold')
-        
-        # Sheet 3: Overbought (Z > 2)
-        overbought = df[df['signal'] == 'OVERBOUGHT'].copy()
-        if len(overbought) > 0:
-            overbought.to_excel(writer, index=False, sheet_name='Overbought')
+    # Write to Excel (streaming write-only workbook, one row in memory at a time)
+    wb = Workbook(write_only=True)
+    
+    # Main sheet
+    _append_sheet(wb, 'All Results', df)
+    
+    # Sheet 2: Oversold opportunities (Z < -2)
+    oversold = df[df['signal'] == 'OVERSOLD']
+    if len(oversold) > 0:
+        _append_sheet(wb, 'Oversold', oversold)
+    
+    # Sheet 3: Overbought (Z > 2)
+    overbought = df[df['signal'] == 'OVERBOUGHT']
+    if len(overbought) > 0:
+        _append_sheet(wb, 'Overbought', overbought)
+    
+    wb.save(output_path)
+    
+    # Parquet twin of the main sheet - downstream readers load this first
+    parquet_path = Path(output_path).with_suffix('.parquet')
+    try:
+        df.to_parquet(parquet_path, index=False, compression='zstd')
+    except Exception as e:
+        print(f"Warning: Parquet copy not written: {e}")
     
     print(f"\nResults saved to: {output_path}")
     print(f"Sorted by Z-score (most oversold first)")
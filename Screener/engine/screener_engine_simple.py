@@ -6,52 +6,70 @@ import sys
 from pathlib import Path
 import yfinance as yf
 import numpy as np
-from datetime import date, timedelta
 import pandas as pd
+from datetime import date, timedelta
 # Add MC Engine to path
 mc_engine_path = Path("/Users/jazzhashzzz/Documents/Market_Analysis_files/Tail End Risk/Mc Engine")
 sys.path.insert(0, str(mc_engine_path))
 
 from monte_carlo_risk_engine import MonteCarloRiskEngine
+from mc_simulation import warmup as warmup_mc
+from cache import FileCache, TTL_INFO, TTL_PRICES
+from yf_session import SESSION
 import warnings
 warnings.filterwarnings('ignore')
 
+# Shared on-disk cache for .info and price history
+CACHE = FileCache()
+
+# Z-score signal indexed by (z > -2) + (z >= 2)
+Z_SIGNALS = ('OVERSOLD', 'NEUTRAL', 'OVERBOUGHT')
+
+
+def _with_days_to_earnings(fundamentals):
+    """
+    Parse the cached ISO earnings date back to a Timestamp and count days to it
+    Recomputed on every call so a day-old cache entry doesn't shift the countdown
+    """
+    earnings_date = fundamentals.get('earnings_date')
+    days_to_earnings = None
+    if earnings_date is not None:
+        earnings_date = pd.Timestamp(earnings_date)
+        if earnings_date.tzinfo is not None:
+            earnings_date = earnings_date.tz_convert(None)
+        days_to_earnings = (earnings_date - pd.Timestamp.now()).days
+    return {**fundamentals, 'earnings_date': earnings_date, 'days_to_earnings': days_to_earnings}
+
 
 def get_simple_fundamentals(ticker):
     """Get basic valuation metrics - P/E, Forward P/E, sector, earnings date"""
+    cached = CACHE.get(ticker, 'info', ttl=TTL_INFO)
+    if cached is not None:
+        return _with_days_to_earnings(cached)
+    
     try:
-        stock = yf.Ticker(ticker)
+        stock = yf.Ticker(ticker, session=SESSION)
         info = stock.info
         
-        # Get earnings date
+        # Get earnings date (cached as an ISO string - JSON has no timestamps)
         earnings_date = None
-        days_to_earnings = None
         try:
             calendar = stock.calendar
             if calendar is not None and 'Earnings Date' in calendar.index:
                 earnings_date = calendar.loc['Earnings Date'][0]
-                
-                # Calculate days until earnings
-                from datetime import datetime
-                if pd.notna(earnings_date):
-                    today = datetime.now()
-                    if isinstance(earnings_date, str):
-                        earnings_dt = pd.to_datetime(earnings_date)
-                    else:
-                        earnings_dt = earnings_date
-                    
-                    days_to_earnings = (earnings_dt - today).days
+                earnings_date = pd.Timestamp(earnings_date).isoformat() if pd.notna(earnings_date) else None
         except:
             pass
         
-        return {
+        fundamentals = {
             'pe_ratio': info.get('trailingPE', None),
             'forward_pe': info.get('forwardPE', None),
             'sector': info.get('sector', 'Unknown'),
             'avg_volume': info.get('averageVolume', None),
             'earnings_date': earnings_date,
-            'days_to_earnings': days_to_earnings,
         }
+        CACHE.set(ticker, 'info', fundamentals)
+        return _with_days_to_earnings(fundamentals)
     except:
         return {
             'pe_ratio': None,
@@ -63,36 +81,94 @@ def get_simple_fundamentals(ticker):
         }
 
 
-def get_z_score(ticker, lookback_days=60):
+def history_start(historical_window):
+    """Download start date covering historical_window trading days (same rule as mc_data)"""
+    calendar_days = int(historical_window * (365/252)) + 100
+    return date.today() - timedelta(days=calendar_days)
+
+
+def fetch_history(ticker, historical_window=252*6):
+    """Daily bars covering the MC window for one ticker - cache first, then yf.Ticker.history"""
+    endpoint = f'history_{historical_window}'
+    hist_data = CACHE.get_frame(ticker, endpoint, ttl=TTL_PRICES)
+    if hist_data is None:
+        hist_data = yf.Ticker(ticker, session=SESSION).history(
+            start=history_start(historical_window), auto_adjust=True, timeout=10
+        )
+        if len(hist_data) > 0:
+            CACHE.set_frame(ticker, endpoint, hist_data)
+    return hist_data
+
+
+def bulk_fetch_history(tickers, historical_window=252*6, batch_size=50):
+    """
+    Daily bars covering the MC window for many tickers - cache first, then batched yf.download
+    Batches of ~50 keep the multi-symbol request under Yahoo's URL limit
+    Returns {ticker: DataFrame}
+    """
+    endpoint = f'history_{historical_window}'
+    histories = {}
+    for ticker in tickers:
+        cached = CACHE.get_frame(ticker, endpoint, ttl=TTL_PRICES)
+        if cached is not None:
+            histories[ticker] = cached
+    
+    missing = [t for t in tickers if t not in histories]
+    for i in range(0, len(missing), batch_size):
+        batch = missing[i:i + batch_size]
+        try:
+            data = yf.download(
+                batch,
+                start=history_start(historical_window),
+                group_by="ticker",
+                auto_adjust=True,
+                threads=True,
+                progress=False,
+                timeout=10,
+                session=SESSION
+            )
+        except Exception:
+            continue
+        
+        if data is None or len(data) == 0:
+            continue
+        
+        for ticker in batch:
+            try:
+                if isinstance(data.columns, pd.MultiIndex):
+                    hist_data = data[ticker]
+                else:
+                    hist_data = data
+            except KeyError:
+                continue
+            
+            hist_data = hist_data.dropna(subset=['Close'])
+            if len(hist_data) > 0:
+                histories[ticker] = hist_data
+                CACHE.set_frame(ticker, endpoint, hist_data)
+    
+    return histories
+
+
+def get_z_score(closes, lookback_days=60):
     """
     Calculate Z-score for mean reversion signal
     Z = (Current Price - Rolling Mean) / Rolling Std
+    closes: NumPy array of daily closes, oldest first
     """
     try:
-        # Try to get more data buffer for safety
-        end_date = date.today()
-        start_date = end_date - timedelta(days=lookback_days + 50)
-        
-        hist_data = yf.download(
-            ticker, 
-            start=start_date, 
-            end=end_date, 
-            progress=False,
-            timeout=10
-        )
-        
         # Need minimum 30 days of data
-        if hist_data is None or len(hist_data) < 30:
+        if closes is None or len(closes) < 30:
             return None
         
         # Use whatever data we have (minimum 30, target 60)
-        actual_lookback = min(lookback_days, len(hist_data))
-        recent_data = hist_data.tail(actual_lookback)
+        actual_lookback = min(lookback_days, len(closes))
+        recent = closes[-actual_lookback:]  # View, not a copy
         
         # Price-based Z-score
-        rolling_mean = float(recent_data['Close'].mean())
-        rolling_std = float(recent_data['Close'].std())
-        current_price = float(recent_data['Close'].iloc[-1])
+        rolling_mean = float(recent.mean())
+        rolling_std = float(recent.std(ddof=1))
+        current_price = float(recent[-1])
         
         if rolling_std > 0 and rolling_mean > 0:
             z_score = (current_price - rolling_mean) / rolling_std
@@ -100,13 +176,8 @@ def get_z_score(ticker, lookback_days=60):
         else:
             return None
         
-        # Simple signal
-        if z_score <= -2:
-            signal = 'OVERSOLD'
-        elif z_score >= 2:
-            signal = 'OVERBOUGHT'
-        else:
-            signal = 'NEUTRAL'
+        # Simple signal: <= -2 oversold, >= 2 overbought
+        signal = Z_SIGNALS[(z_score > -2) + (z_score >= 2)]
         
         return {
             'z_score': z_score,
@@ -118,17 +189,40 @@ def get_z_score(ticker, lookback_days=60):
         return None
 
 
-def analyze_stock(ticker, days_to_simulate=90, num_simulations=10000, historical_window=252*6):
+def analyze_stock(ticker, days_to_simulate=90, num_simulations=10000, historical_window=252*6,
+                  history=None):
     """
     Enhanced analysis - adds P/E and Z-score to existing Monte Carlo
     Drop-in replacement for original analyze_stock function
+    history: optional pre-fetched daily bars covering historical_window (see bulk_fetch_history)
     """
     try:
+        # One history download serves the MC engine, the Z-score and the 52-week high
+        if history is None:
+            try:
+                history = fetch_history(ticker, historical_window)
+            except Exception:
+                history = pd.DataFrame()
+        
+        # No price data (delisted, bad symbol) - fail before any other request
+        if len(history) == 0:
+            return {
+                'ticker': ticker,
+                'success': False,
+                'error': f"No data found for {ticker}"
+            }
+        
         # Get fundamentals
         fundamentals = get_simple_fundamentals(ticker)
         
+        # Z-score and 52-week high use completed sessions only (the original end=today
+        # downloads excluded today); the MC engine keeps today's bar like mc_data does
+        completed = history[history.index.date < date.today()]  # Exchange-local dates, tz-aware or not
+        
         # Get Z-score
-        z_data = get_z_score(ticker)
+        # Zero-copy view of the float64 Close column
+        closes = completed['Close'].to_numpy(dtype=np.float64, copy=False)
+        z_data = get_z_score(closes)
         
         # Set defaults if Z-score calculation failed
         if z_data:
@@ -140,31 +234,21 @@ def analyze_stock(ticker, days_to_simulate=90, num_simulations=10000, historical
             distance_from_mean_pct = 0.0
             signal = 'UNKNOWN'
         
-        # Run existing Monte Carlo analysis
+        # Run existing Monte Carlo analysis on the already-downloaded history
         engine = MonteCarloRiskEngine(
             stock_symbol=ticker,
-            starting_capital=1000,
             days_to_simulate=days_to_simulate,
             num_simulations=num_simulations,
             historical_window=historical_window,
-            max_tolerable_loss_pct=80
+            keep_paths=False,  # Only percentiles are read - skip the path matrix
+            preloaded_history=history,
+            parallel=False     # Already on a pool thread - numba's parallel layer isn't reentrant
         )
         
-        # Get 52-week high (existing logic)
-        try:
-            end_date = date.today()
-            start_date = end_date - timedelta(days=365)
-            hist_data = yf.download(ticker, start=start_date, end=end_date, progress=False)
-            
-            if len(hist_data) > 0:
-                recent_high = float(hist_data['High'].max())
-                drop_from_high_pct = ((engine.stock_price - recent_high) / recent_high) * 100
-            else:
-                recent_high = engine.stock_price
-                drop_from_high_pct = 0.0
-        except:
-            recent_high = engine.stock_price
-            drop_from_high_pct = 0.0
+        # 52-week high from the last year of the same completed sessions
+        last_year = completed.index >= completed.index[-1] - pd.Timedelta(days=365)
+        recent_high = float(completed['High'].to_numpy()[last_year].max())
+        drop_from_high_pct = ((engine.stock_price - recent_high) / recent_high) * 100
         
         # Extract percentiles (existing logic)
         p5 = engine.stock_percentiles[engine.stock_percentiles['percentile'] == 5]['return'].values[0]
@@ -1,21 +1,27 @@
 """Load tickers from ticker.txt"""
 from pathlib import Path
 
+import pandas as pd
+
 def load_tickers(filepath):
     """
     Load tickers from tab-separated file
     Format: ticker\tvolume
     Returns list of ticker symbols
     """
-    tickers = []
-    
-    with open(filepath, 'r') as f:
-        for line in f:
-            line = line.strip()
-            if line:
-                parts = line.split('\t')
-                if parts:
-                    ticker = parts[0].strip().upper()
-                    tickers.append(ticker)
+    # C parser, first column only; keep_default_na so tickers like "NA" survive
+    try:
+        tickers = pd.read_csv(
+            filepath,
+            sep='\t',
+            header=None,
+            usecols=[0],
+            dtype=str,
+            keep_default_na=False
+        )[0]
+    except pd.errors.EmptyDataError:
+        # Empty (or blank-lines-only) file
+        return []
     
-    return tickers
\ No newline at end of file
+    tickers = tickers.str.strip().str.upper()
+    return tickers[tickers != ''].tolist()
\ No newline at end of file
@@ -0,0 +1,18 @@
+"""Shared HTTP session for yfinance - one connection pool, keep-alive across tickers"""
+
+try:
+    # yfinance's preferred backend (browser-impersonating, thread-local handles)
+    from curl_cffi import requests as curl_requests
+    SESSION = curl_requests.Session(impersonate="chrome")
+except ImportError:
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    SESSION = requests.Session()
+    _adapter = HTTPAdapter(
+        pool_connections=32,
+        pool_maxsize=32,
+        max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504))
+    )
+    SESSION.mount('https://', _adapter)
@@ -4,14 +4,20 @@ Analyzes all stocks in ticker.txt and outputs to Excel
 """
 import sys
 import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+
 # Add engine directory to path
 engine_path = Path(__file__).parent / "engine"
 sys.path.insert(0, str(engine_path))
 
 from engine.ticker_loader import load_tickers
-from engine.screener_engine_simple import analyze_stock  # Updated import
+from engine.screener_engine_simple import analyze_stock, bulk_fetch_history, warmup_mc  # Updated import
 from engine.excel_writer_simple import write_results_to_excel  # Updated import
 
 # ============================================================================
@@ -25,8 +31,79 @@ DAYS_TO_SIMULATE = 90
 NUM_SIMULATIONS = 10000
 HISTORICAL_WINDOW = 252*6
 
-# Global results list for signal handler
-RESULTS = []
+MAX_WORKERS = 16  # Tickers in flight at once (network-bound; MC kernels release the GIL)
+
+# Result columns and their buffer dtypes (None/odd values become NaN in float columns)
+RESULT_COLUMNS = {
+    'ticker': object,
+    'current_price': np.float64,
+    'recent_high': np.float64,
+    'drop_from_high_pct': np.float64,
+    'volatility': np.float64,
+    'p5': np.float64,
+    'p10': np.float64,
+    'p50': np.float64,
+    'pe_ratio': np.float64,
+    'forward_pe': np.float64,
+    'sector': object,
+    'avg_volume': np.float64,
+    'earnings_date': object,
+    'days_to_earnings': np.float64,
+    'z_score': np.float64,
+    'distance_from_mean_pct': np.float64,
+    'signal': object,
+}
+
+# Fixed signal labels from analyze_stock (stored as categorical codes)
+SIGNAL_CATEGORIES = ['OVERSOLD', 'NEUTRAL', 'OVERBOUGHT', 'UNKNOWN']
+
+# Global struct-of-arrays result buffer for signal handler
+# One preallocated array per column, rows [0, RESULTS_COUNT) are filled
+RESULTS = {}
+RESULTS_COUNT = 0
+RESULTS_LOCK = threading.RLock()
+EXECUTOR = None
+
+# ============================================================================
+# RESULT BUFFER
+# ============================================================================
+
+def allocate_results(n):
+    """Preallocate one typed array per result column for n tickers"""
+    global RESULTS, RESULTS_COUNT
+    with RESULTS_LOCK:
+        RESULTS = {col: np.empty(n, dtype=dtype) for col, dtype in RESULT_COLUMNS.items()}
+        RESULTS_COUNT = 0
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def store_result(result):
+    """Write one successful analyze_stock result into the next buffer row"""
+    global RESULTS_COUNT
+    with RESULTS_LOCK:
+        row = RESULTS_COUNT
+        for col, dtype in RESULT_COLUMNS.items():
+            value = result.get(col)
+            RESULTS[col][row] = value if dtype is object else _to_float(value)
+        RESULTS_COUNT = row + 1
+
+
+def results_frame():
+    """DataFrame of the rows filled so far (one column array each, no per-row dicts)"""
+    with RESULTS_LOCK:
+        df = pd.DataFrame({col: buf[:RESULTS_COUNT].copy() for col, buf in RESULTS.items()})
+    
+    # Low-cardinality strings as categoricals - filters compare int codes
+    if len(df) > 0:
+        df['signal'] = pd.Categorical(df['signal'], categories=SIGNAL_CATEGORIES)
+        df['sector'] = df['sector'].astype('category')
+    return df
 
 # ============================================================================
 # SIGNAL HANDLER FOR CTRL+C
@@ -38,10 +115,16 @@ def signal_handler(sig, frame):
     print("INTERRUPTED - Saving partial results...")
     print("="*80)
     
-    if RESULTS:
+    # Stop queued tickers - in-flight ones finish on their own
+    if EXECUTOR is not None:
+        EXECUTOR.shutdown(wait=False, cancel_futures=True)
+    
+    snapshot = results_frame()
+    
+    if len(snapshot) > 0:
         try:
-            write_results_to_excel(RESULTS, OUTPUT_FILE)
-            print(f"\nSaved {len(RESULTS)} results before exit")
+            write_results_to_excel(snapshot, OUTPUT_FILE)
+            print(f"\nSaved {len(snapshot)} results before exit")
         except Exception as e:
             print(f"Error saving: {e}")
     else:
@@ -57,7 +140,7 @@ signal.signal(signal.SIGINT, signal_handler)
 # ============================================================================
 
 def main():
-    global RESULTS
+    global EXECUTOR
     
     print("\n" + "="*80)
     print("MONTE CARLO STOCK SCREENER - Enhanced with P/E & Z-Score")
@@ -76,18 +159,42 @@ def main():
     
     save_interval = 100  # Save every 100 stocks
     
-    for i, ticker in enumerate(tickers, 1):
-        print(f"[{i}/{len(tickers)}] {ticker}...", end=" ", flush=True)
-        
-        result = analyze_stock(
+    # One batched download for every ticker's history (MC engine + Z-score + 52-week high)
+    print("Fetching price history in batches...", end=" ", flush=True)
+    histories = bulk_fetch_history(tickers, historical_window=HISTORICAL_WINDOW)
+    print(f"✓ {len(histories)}/{len(tickers)}")
+    
+    allocate_results(len(tickers))
+    
+    # Compile the MC kernel once here rather than in the first worker to reach it
+    warmup_mc()
+    
+    EXECUTOR = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+    futures = {
+        EXECUTOR.submit(
+            analyze_stock,
             ticker,
             days_to_simulate=DAYS_TO_SIMULATE,
             num_simulations=NUM_SIMULATIONS,
-            historical_window=HISTORICAL_WINDOW
-        )
+            historical_window=HISTORICAL_WINDOW,
+            history=histories.get(ticker)
+        ): ticker
+        for ticker in tickers
+    }
+    
+    # Drain in completion order so slow tickers don't hold up the rest
+    # Progress bar redraws at a fixed rate; only signals and failures get their own line
+    pbar = tqdm(as_completed(futures), total=len(futures), desc="Screening", unit="ticker")
+    for i, future in enumerate(pbar, 1):
+        ticker = futures[future]
+        
+        try:
+            result = future.result()
+        except Exception as e:
+            result = {'ticker': ticker, 'success': False, 'error': str(e)}
         
         if result['success']:
-            RESULTS.append(result)
+            store_result(result)
             
             # Enhanced output with signal
             signal_tag = f"[{result['signal']}]" if result['signal'] != 'NEUTRAL' else ""
@@ -103,40 +210,51 @@ def main():
                 elif -7 <= days < 0:
                     earnings_warning = f" 📊REPORTED:{abs(days)}d ago"
             
-            print(f"✓ {signal_tag} {z_score_str}, {pe_str}, drop={result['drop_from_high_pct']:.1f}%{earnings_warning}")
+            pbar.set_postfix(ticker=ticker, signal=result['signal'], refresh=False)
+            if result['signal'] != 'NEUTRAL' or earnings_warning:
+                tqdm.write(f"{ticker}: ✓ {signal_tag} {z_score_str}, {pe_str}, drop={result['drop_from_high_pct']:.1f}%{earnings_warning}")
         else:
-            print(f"✗ Failed")
+            tqdm.write(f"{ticker}: ✗ Failed")
         
         # Periodic save every 100 stocks
-        if i % save_interval == 0 and RESULTS:
-            print(f"\n[Auto-saving progress: {len(RESULTS)} stocks completed]")
+        if i % save_interval == 0 and RESULTS_COUNT:
+            tqdm.write(f"[Auto-saving progress: {RESULTS_COUNT} stocks completed]")
             try:
-                write_results_to_excel(RESULTS, OUTPUT_FILE)
+                write_results_to_excel(results_frame(), OUTPUT_FILE)
             except Exception as e:
-                print(f"Warning: Auto-save failed: {e}")
+                tqdm.write(f"Warning: Auto-save failed: {e}")
+    
+    pbar.close()
+    EXECUTOR.shutdown()
+    EXECUTOR = None
     
     # Final save and analysis
     print("\n" + "="*80)
-    print(f"Successful: {len(RESULTS)}/{len(tickers)}")
+    print(f"Successful: {RESULTS_COUNT}/{len(tickers)}")
     
-    if RESULTS:
-        import pandas as pd
-        df = pd.DataFrame(RESULTS)
+    if RESULTS_COUNT:
+        df = results_frame()
         
         # Show mean reversion opportunities
         print("\n" + "="*80)
         print("MEAN REVERSION OPPORTUNITIES (Value + Statistical Dislocation):")
         print("="*80)
         
+        # Pull each screened column out once; both opportunity masks reuse these arrays
+        oversold = (df['signal'] == 'OVERSOLD').to_numpy()
+        pe = df['pe_ratio'].to_numpy()
+        vol = df['volatility'].to_numpy()
+        drop = df['drop_from_high_pct'].to_numpy()
+        p10 = df['p10'].to_numpy()
+        
         # Oversold stocks with reasonable P/E
-        mean_reversion_long = df[
-            (df['signal'] == 'OVERSOLD') &           # Z-score < -2
-            (df['pe_ratio'].notna()) &                # Has P/E data
-            (df['pe_ratio'] > 0) &                    # Profitable
-            (df['pe_ratio'] < 30) &                   # Not overvalued
-            (df['volatility'] >= 15) &                # Enough vol for options
-            (df['volatility'] <= 40)                  # Not too crazy
-        ]
+        mean_reversion_long = df.iloc[np.flatnonzero(
+            oversold &                                # Z-score < -2
+            (pe > 0) &                                # Has P/E data, profitable (NaN compares False)
+            (pe < 30) &                               # Not overvalued
+            (vol >= 15) &                             # Enough vol for options
+            (vol <= 40)                               # Not too crazy
+        )]
         
         print(f"\nOversold + Reasonable Valuation: {len(mean_reversion_long)} candidates")
         print(f"  Criteria: Z < -2, P/E 0-30, Vol 15-40%\n")
@@ -153,13 +271,13 @@ def main():
         print("SELLING OPPORTUNITIES (Original Logic):")
         print("="*80)
         
-        selling_zone = df[
-            (df['drop_from_high_pct'] <= -10) &  # Already dropped 10%+
-            (df['p10'] >= -10) &                  # Limited forward downside
-            (df['p10'] <= -5) &
-            (df['volatility'] >= 15) &            # Enough vol for premium
-            (df['volatility'] <= 30)              # Not too crazy
-        ]
+        selling_zone = df.iloc[np.flatnonzero(
+            (drop <= -10) &                       # Already dropped 10%+
+            (p10 >= -10) &                        # Limited forward downside
+            (p10 <= -5) &
+            (vol >= 15) &                         # Enough vol for premium
+            (vol <= 30)                           # Not too crazy
+        )]
         
         print(f"\nFound {len(selling_zone)} candidates:")
         print(f"  Criteria: Dropped 10%+, forward p10 -5% to -10%, vol 15-30%\n")
@@ -169,7 +287,7 @@ def main():
             print(display.to_string(index=False))
         
         # Write final Excel
-        write_results_to_excel(RESULTS, OUTPUT_FILE)
+        write_results_to_excel(df, OUTPUT_FILE)
     
     print("\n" + "="*80)
     print("DONE - Open Excel and filter by:")
@@ -3,11 +3,25 @@ Ultra-fast prescreener using bulk price data
 Reads JSON ticker list, cuts 12k → ~2–4k in minutes
 """
 
+import sys
 import yfinance as yf
 import pandas as pd
-import json
 from pathlib import Path
 import math
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Add screener engine to path (shared yfinance session)
+engine_path = Path(__file__).parent.parent / "engine"
+sys.path.insert(0, str(engine_path))
+
+from yf_session import SESSION
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+    import json
 
 INPUT_JSON = "/Users/jazzhashzzz/Documents/Market_Analysis_files/ticker.json"
 OUTPUT_TICKERS = "/Users/jazzhashzzz/Documents/Market_Analysis_files/ticker_filtered.txt"
@@ -16,20 +30,17 @@ BATCH_SIZE = 100
 MIN_PRICE = 5
 MIN_AVG_VOL = 800_000
 
+MAX_WORKERS = 4   # Batches in flight - Yahoo rate-limits aggressive clients
+MAX_RETRIES = 3   # Attempts per batch, with exponential backoff
+
 
 def load_tickers_from_json(path):
-    """Load tickers from JSON file"""
-    with open(path, 'r') as f:
-        data = json.load(f)
+    """Load tickers from JSON file (orjson when installed)"""
+    raw = Path(path).read_bytes()
+    data = orjson.loads(raw) if orjson is not None else json.loads(raw)
     
     # Extract tickers from JSON structure
-    tickers = []
-    for key in data:
-        if 'ticker' in data[key]:
-            ticker = data[key]['ticker'].strip().upper()
-            tickers.append(ticker)
-    
-    return tickers
+    return [entry['ticker'].strip().upper() for entry in data.values() if 'ticker' in entry]
 
 
 def chunk(lst, n):
@@ -38,6 +49,54 @@ def chunk(lst, n):
         yield lst[i:i + n]
 
 
+def download_batch(batch):
+    """Download 30 days of bars for one batch, backing off on failure/rate limits"""
+    for attempt in range(MAX_RETRIES):
+        try:
+            data = yf.download(
+                batch,
+                period="30d",
+                group_by="ticker",
+                auto_adjust=True,
+                threads=True,
+                progress=False,
+                session=SESSION
+            )
+            if data is not None and len(data) > 0:
+                return data
+        except Exception:
+            pass
+        
+        if attempt < MAX_RETRIES - 1:
+            time.sleep(2 ** attempt)
+    
+    return None
+
+
+def process_batch(batch):
+    """Return the tickers in batch that pass the filters, or None if the download failed"""
+    data = download_batch(batch)
+    if data is None:
+        return None
+    
+    # Single-ticker downloads come back flat - give them the same (ticker, field) layout
+    if not isinstance(data.columns, pd.MultiIndex):
+        data = pd.concat({batch[0]: data}, axis=1)
+    
+    if len(data) < 10:
+        return []
+    
+    # One reduction per field across every ticker in the batch
+    last_close = data.xs("Close", axis=1, level=1).iloc[-1]
+    avg_vol = data.xs("Volume", axis=1, level=1).mean(axis=0)
+    
+    passed_mask = (last_close >= MIN_PRICE) & (avg_vol >= MIN_AVG_VOL)
+    passed = set(last_close.index[passed_mask])
+    
+    # Yahoo may reorder columns - report in batch order
+    return [t for t in batch if t in passed]
+
+
 def main():
     print("\n" + "=" * 60)
     print("PRESCREENER - JSON Input")
@@ -52,51 +111,30 @@ def main():
     print(f"  Min Price: ${MIN_PRICE}")
     print(f"  Min Avg Volume: {MIN_AVG_VOL:,}")
     
-    passed = []
     total_batches = math.ceil(len(tickers) / BATCH_SIZE)
     
     print(f"\nProcessing {total_batches} batches of {BATCH_SIZE}...")
     print("=" * 60)
 
-    for i, batch in enumerate(chunk(tickers, BATCH_SIZE), 1):
-        print(f"Batch {i:3d} / {total_batches} ({len(batch):3d} tickers)...", end=" ", flush=True)
-
-        try:
-            data = yf.download(
-                batch,
-                period="30d",
-                group_by="ticker",
-                auto_adjust=True,
-                threads=False,
-                progress=False
-            )
-        except Exception as e:
-            print(f"✗ Failed to download")
-            continue
-
-        batch_passed = 0
-        for ticker in batch:
-            try:
-                # Handle single ticker vs multi-ticker data structure
-                if len(batch) == 1:
-                    df = data
-                else:
-                    df = data[ticker]
-                
-                if len(df) < 10:
-                    continue
-
-                price = df["Close"].iloc[-1]
-                avg_vol = df["Volume"].mean()
-
-                if price >= MIN_PRICE and avg_vol >= MIN_AVG_VOL:
-                    passed.append(ticker)
-                    batch_passed += 1
-
-            except:
-                continue
+    batches = list(chunk(tickers, BATCH_SIZE))
+    batch_results = [None] * total_batches
+    
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as ex:
+        futures = {ex.submit(process_batch, batch): i for i, batch in enumerate(batches)}
         
-        print(f"✓ {batch_passed} passed")
+        for future in as_completed(futures):
+            i = futures[future]
+            batch_passed = future.result()
+            batch_results[i] = batch_passed
+            
+            print(f"Batch {i + 1:3d} / {total_batches} ({len(batches[i]):3d} tickers)...", end=" ")
+            if batch_passed is None:
+                print(f"✗ Failed to download")
+            else:
+                print(f"✓ {len(batch_passed)} passed")
+    
+    # Keep input order regardless of completion order
+    passed = [t for batch_passed in batch_results if batch_passed for t in batch_passed]
 
     # Save results
     with open(OUTPUT_TICKERS, "w") as f:
@@ -0,0 +1,60 @@
+"""On-disk cache of finished runs - re-checking a target price skips the simulation"""
+import os
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Set MC_OUTPUT_DIR to write dashboards somewhere other than the default
+OUTPUT_DIR = Path(os.environ.get(
+    'MC_OUTPUT_DIR',
+    '/Users/jazzhashzzz/Documents/Market_Analysis_files/output/monte_carlo_risk_engine'
+))
+CACHE_DIR = OUTPUT_DIR / 'cache'
+
+
+def results_path(stock_symbol, days_to_simulate, num_simulations, historical_window,
+                 custom_stock_price=None, as_of=None):
+    """Cache file for one run configuration - dated (default today) so it rolls over with market data"""
+    # repr round-trips the float exactly - nearby backtest prices never share an entry
+    start = 'market' if custom_stock_price is None else repr(float(custom_stock_price))
+    as_of = as_of or date.today()
+    return CACHE_DIR / (
+        f'results_{stock_symbol}_{days_to_simulate}_{num_simulations}_'
+        f'{historical_window}_{start}_{as_of:%Y%m%d}.npz'
+    )
+
+
+def save_results(path, sorted_prices, stock_percentiles, viz_path):
+    """Store what the target price check needs: sorted final prices, percentile table, dashboard path"""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez(
+            path,
+            sorted_prices=sorted_prices,
+            percentile=stock_percentiles['percentile'].to_numpy(),
+            price=stock_percentiles['price'].to_numpy(),
+            viz_path=str(viz_path)
+        )
+    except OSError:
+        pass
+
+
+def load_results(path):
+    """
+    Return (sorted_prices, stock_percentiles, viz_path) from an earlier run, or None
+    A missing dashboard image counts as a miss so it gets redrawn
+    """
+    try:
+        with np.load(path) as cached:
+            viz_path = Path(str(cached['viz_path']))
+            if not viz_path.exists():
+                return None
+            stock_percentiles = pd.DataFrame({
+                'percentile': cached['percentile'],
+                'price': cached['price']
+            })
+            return cached['sorted_prices'], stock_percentiles, viz_path
+    except (OSError, ValueError, KeyError):
+        return None
@@ -20,6 +20,18 @@ def download_data(stock_symbol, historical_window):
     
     return stock_data
 
+def use_preloaded_data(stock_data, stock_symbol):
+    """Validate and normalize history the caller already downloaded"""
+    if stock_data is None or len(stock_data) == 0:
+        raise ValueError(f"No data found for {stock_symbol}")
+    
+    # Flatten multi-level columns if present
+    if isinstance(stock_data.columns, pd.MultiIndex):
+        stock_data = stock_data.copy()
+        stock_data.columns = stock_data.columns.get_level_values(0)
+    
+    return stock_data
+
 def set_starting_prices(stock_data, stock_symbol, custom_stock_price=None):
     """Set starting prices from custom values or current market prices"""
     print("\nSetting starting prices...")
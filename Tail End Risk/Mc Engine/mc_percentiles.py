@@ -2,30 +2,104 @@
 import numpy as np
 import pandas as pd
 
-def calculate_percentiles(stock_final_returns, stock_final_prices=None):
-    """Calculate percentile statistics"""
+try:
+    from numba import njit, prange, get_num_threads
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True, parallel=True)
+    def _quantile_rows(arr, scale, ranks, lo, hi, frac):
+        """
+        Per-row quantiles of arr * scale, one row per thread
+        Selects only the needed ranks and scales the results - no scaled copy
+        ranks must be sorted; each select only scans what is right of the last one
+        """
+        rows = arr.shape[0]
+        out = np.empty((lo.size, rows))
+
+        for d in prange(rows):
+            row = arr[d].copy()
+            start = 0
+            for r in ranks:
+                row[start:] = np.partition(row[start:], r - start)
+                start = r
+
+            for k in range(lo.size):
+                below = row[lo[k]]
+                out[k, d] = (below + (row[hi[k]] - below) * frac[k]) * scale
+
+        return out
+
+
+def batched_quantile(arr, qs, scale=1.0):
+    """
+    np.quantile(arr * scale, qs, axis=1) - shape (len(qs), arr.shape[0])
+    Numba kernel when it can spread rows over threads; NumPy's introselect is faster on one core
+    """
+    qs = np.asarray(qs, dtype=np.float64)
+
+    if NUMBA_AVAILABLE and get_num_threads() > 1:
+        n = arr.shape[1]
+        pos = qs * (n - 1)
+        lo = np.floor(pos).astype(np.intp)
+        hi = np.minimum(lo + 1, n - 1)
+        ranks = np.unique(np.concatenate([lo, hi]))
+        return _quantile_rows(np.ascontiguousarray(arr), scale, ranks, lo, hi, pos - lo)
+
+    return np.quantile(np.multiply(arr, arr.dtype.type(scale)), qs, axis=1)
+
+def percentile_sorted(sorted_values, q):
+    """
+    Same result as np.percentile (linear interpolation) on already-sorted data
+    Indexes into the array instead of partitioning it again
+    """
+    n = len(sorted_values)
+    pos = np.asarray(q, dtype=np.float64) / 100 * (n - 1)
+    lo = np.floor(pos).astype(np.intp)
+    hi = np.minimum(lo + 1, n - 1)
+    frac = pos - lo
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * frac
+
+def percentile_rank(sorted_values, targets):
+    """Percent of sorted_values at or below each target (scalar or array)"""
+    return np.searchsorted(sorted_values, targets, side='right') * (100.0 / sorted_values.size)
+
+def calculate_percentiles(stock_final_returns, stock_final_prices=None, sorted_returns=None,
+                          sorted_prices=None):
+    """Calculate percentile statistics (pass sorted_returns/sorted_prices to skip the sorts)"""
     print("\nCalculating percentiles...")
     
     percentiles = [1, 5, 10, 25, 50, 75, 90, 95, 99]
     
+    if sorted_returns is None:
+        sorted_returns = np.sort(stock_final_returns)
+    
     stock_percentiles = pd.DataFrame({
         'percentile': percentiles,
-        'return': np.percentile(stock_final_returns, percentiles)
+        'return': percentile_sorted(sorted_returns, percentiles)
     })
     
     # Add price percentiles if prices are provided
-    if stock_final_prices is not None:
+    if sorted_prices is not None:
+        stock_percentiles['price'] = percentile_sorted(sorted_prices, percentiles)
+    elif stock_final_prices is not None:
         stock_percentiles['price'] = np.percentile(stock_final_prices, percentiles)
     
     return stock_percentiles
 
-def calculate_cvar(returns):
+def calculate_cvar(returns, sorted_returns=None):
     """Calculate Conditional Value at Risk (CVaR) / Expected Shortfall"""
-    var_95 = np.percentile(returns, 5)
-    var_99 = np.percentile(returns, 1)
+    if sorted_returns is None:
+        sorted_returns = np.sort(returns)
+    
+    var_95, var_99 = percentile_sorted(sorted_returns, [5, 1])
     
-    cvar_95 = returns[returns <= var_95].mean()
-    cvar_99 = returns[returns <= var_99].mean()
+    # Tail is a prefix of the sorted array - no boolean mask needed
+    cvar_95 = sorted_returns[:np.searchsorted(sorted_returns, var_95, side='right')].mean()
+    cvar_99 = sorted_returns[:np.searchsorted(sorted_returns, var_99, side='right')].mean()
     
     return {
         'var_95': var_95,
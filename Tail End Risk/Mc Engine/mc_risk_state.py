@@ -1,9 +1,11 @@
 import numpy as np
+from mc_percentiles import percentile_sorted
 
 def calculate_risk_state_score(
     stock_data,
     final_returns,
-    stock_cvar
+    stock_cvar,
+    sorted_returns=None
 ):
     """
     Build 4-component Risk State Score:
@@ -54,8 +56,9 @@ def calculate_risk_state_score(
     # =====================================
     # 4. Distribution Width
     # =====================================
-    p95 = np.percentile(final_returns, 95)
-    p5 = np.percentile(final_returns, 5)
+    if sorted_returns is None:
+        sorted_returns = np.sort(final_returns)
+    p95, p5 = percentile_sorted(sorted_returns, [95, 5])
 
     width = abs(p95 - p5)
 
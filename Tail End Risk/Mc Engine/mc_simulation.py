@@ -7,8 +7,117 @@ Adds:
 - Volatility stress testing
 """
 
+import zlib
+
 import numpy as np
 
+from mc_percentiles import percentile_sorted
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True, fastmath=True, nogil=True)
+    def _simulate_path(j, stock_price, drift, scale, sigma0, z, jumps, jump_magnitude, lambda_,
+                       out_paths):
+        """
+        Fused EWMA vol + returns + jumps + compounding for path j, returns its final price
+        The path streams through time in registers - only the outputs are written
+        """
+        days = z.shape[0]
+        has_jumps = jumps.shape[0] > 0
+        keep_paths = out_paths.shape[0] > 0
+        sigma = sigma0
+        price = stock_price
+        for t in range(days):
+            if t > 0:
+                shock = sigma * z[t-1, j]
+                sigma = np.sqrt(lambda_ * sigma * sigma + (1 - lambda_) * shock * shock)
+            
+            daily_return = drift + sigma * scale * z[t, j]
+            if has_jumps and jumps[t, j]:
+                daily_return += jump_magnitude
+            
+            price *= 1 + daily_return
+            if keep_paths:
+                out_paths[t, j] = price
+        
+        return price
+    
+    @njit(cache=True, fastmath=True, parallel=True, nogil=True)
+    def _simulate_paths(stock_price, mu, sigma0, z, jumps, jump_magnitude, lambda_,
+                        out_paths, out_final):
+        """
+        All paths, one path per thread - for a single ticker (run_analysis)
+        An empty (0, 0) out_paths skips storing the full path matrix
+        """
+        drift = mu / 252
+        scale = 1.0 / np.sqrt(252.0)
+        for j in prange(z.shape[1]):
+            out_final[j] = _simulate_path(j, stock_price, drift, scale, sigma0, z, jumps,
+                                          jump_magnitude, lambda_, out_paths)
+    
+    @njit(cache=True, fastmath=True, nogil=True)
+    def _simulate_paths_serial(stock_price, mu, sigma0, z, jumps, jump_magnitude, lambda_,
+                               out_paths, out_final):
+        """
+        Same as _simulate_paths on the calling thread only - safe to run from many threads
+        Numba's workqueue layer aborts on concurrent parallel=True calls (the screener's pool)
+        """
+        drift = mu / 252
+        scale = 1.0 / np.sqrt(252.0)
+        for j in range(z.shape[1]):
+            out_final[j] = _simulate_path(j, stock_price, drift, scale, sigma0, z, jumps,
+                                          jump_magnitude, lambda_, out_paths)
+else:
+    def _simulate_paths(stock_price, mu, sigma0, z, jumps, jump_magnitude, lambda_,
+                        out_paths, out_final):
+        """NumPy fallback - vectorized across paths, one step per day"""
+        days = z.shape[0]
+        
+        # EWMA volatility clustering
+        sigma_t = np.empty(z.shape, dtype=z.dtype)
+        sigma_t[0] = sigma0
+        for t in range(1, days):
+            sigma_t[t] = np.sqrt(
+                lambda_ * sigma_t[t-1]**2 +
+                (1 - lambda_) * (sigma_t[t-1] * z[t-1])**2
+            )
+        
+        # Drift + stochastic vol + jumps
+        daily_returns = np.float32(mu / 252) + sigma_t * np.float32(1 / np.sqrt(252)) * z
+        if jumps.shape[0] > 0:
+            daily_returns[jumps] += jump_magnitude
+        
+        if out_paths.shape[0] > 0:
+            np.cumprod(1 + daily_returns, axis=0, out=out_paths)
+            out_paths *= stock_price
+            out_final[:] = out_paths[-1]
+        else:
+            # Compound in place - only one N-sized price vector
+            out_final[:] = stock_price
+            for t in range(days):
+                out_final *= 1 + daily_returns[t]
+    
+    _simulate_paths_serial = _simulate_paths
+
+
+def warmup(parallel=False):
+    """
+    Compile/load the path kernel once on a tiny input
+    Call before fanning out to worker threads so none of them blocks on the JIT
+    parallel picks which kernel to warm (the screener's threads use the serial one)
+    """
+    z = np.zeros((2, 2), dtype=np.float32)
+    jumps = np.zeros((2, 2), dtype=np.bool_)
+    kernel = _simulate_paths if parallel else _simulate_paths_serial
+    kernel(1.0, 0.0, 0.1, z, jumps, 0.0, 0.94,
+           np.empty((0, 0), dtype=np.float32), np.empty(2))
+
 
 def run_single_simulation(
     stock_price,
@@ -19,67 +128,78 @@ def run_single_simulation(
     jump_prob=0.0,
     jump_magnitude=0.0,
     df=5,              # Student-t degrees of freedom
-    lambda_=0.94       # EWMA decay factor
+    lambda_=0.94,      # EWMA decay factor
+    return_paths=False, # Keep the full (days, sims) price matrix
+    rng=None,          # np.random.Generator (fresh unseeded one if None)
+    parallel=True      # Spread paths over cores (False when the caller is already threaded)
 ):
     """
     Run Monte Carlo block with:
     - Student-t shocks
     - Time-varying EWMA volatility
     - Jump process
+    paths is None unless return_paths is set
     """
 
     # ==============================
     # 1. Student-t shocks
     # ==============================
-    z = np.random.standard_t(df, size=(days_to_simulate, num_simulations))
+    if rng is None:
+        rng = np.random.default_rng()
+    
+    # Student-t as normal / sqrt(chi2/df), drawn directly in float32 (standard_t is fp64-only)
+    # float32 halves memory traffic; percentile outputs don't need fp64 precision
+    shape = (days_to_simulate, num_simulations)
+    z = rng.standard_normal(shape, dtype=np.float32)
+    chi2_over_df = rng.standard_gamma(df / 2, shape, dtype=np.float32)
+    chi2_over_df *= np.float32(2 / df)
+    np.sqrt(chi2_over_df, out=chi2_over_df)
+    z /= chi2_over_df
     
     # Scale to unit variance
-    z = z / np.sqrt(df / (df - 2))
+    z *= np.float32(1 / np.sqrt(df / (df - 2)))
 
     # ==============================
-    # 2. EWMA Volatility Clustering
-    # ==============================
-    sigma_t = np.zeros((days_to_simulate, num_simulations))
-    sigma_t[0] = sigma
-
-    for t in range(1, days_to_simulate):
-        sigma_t[t] = np.sqrt(
-            lambda_ * sigma_t[t-1]**2 +
-            (1 - lambda_) * (sigma_t[t-1] * z[t-1])**2
-        )
-
-    # ==============================
-    # 3. Drift + Stochastic Vol
-    # ==============================
-    daily_returns = (
-        mu / 252 +
-        sigma_t / np.sqrt(252) * z
-    )
-
-    # ==============================
-    # 4. Distributed Jump Process
+    # 2. Distributed Jump Process
     # ==============================
     if jump_prob > 0:
-        jump_matrix = np.random.rand(days_to_simulate, num_simulations) < jump_prob
-        daily_returns[jump_matrix] += jump_magnitude
+        jumps = rng.random((days_to_simulate, num_simulations)) < jump_prob
+    else:
+        jumps = np.zeros((0, 0), dtype=np.bool_)
 
     # ==============================
-    # 5. Price Path Construction
+    # 3. EWMA vol + drift + jumps + price paths (fused)
     # ==============================
-    paths = stock_price * np.cumprod(1 + daily_returns, axis=0)
-    final_prices = paths[-1]
+    if return_paths:
+        paths = np.empty((days_to_simulate, num_simulations), dtype=np.float32)
+    else:
+        paths = np.empty((0, 0), dtype=np.float32)
+    final_prices = np.empty(num_simulations)  # fp64 - path state is carried in fp64
+    
+    kernel = _simulate_paths if parallel else _simulate_paths_serial
+    kernel(
+        float(stock_price), float(mu), float(sigma), z,
+        jumps, float(jump_magnitude), float(lambda_), paths, final_prices
+    )
+    
     final_returns = (final_prices / stock_price - 1) * 100
 
-    return paths, final_prices, final_returns
+    return (paths if return_paths else None), final_prices, final_returns
 
 
-def run_monte_carlo(stock_price, stats, days_to_simulate, num_simulations):
+def run_monte_carlo(stock_price, stats, days_to_simulate, num_simulations, keep_paths=True,
+                    stock_symbol=None, parallel=True):
     """
     Run base simulation + volatility stress scenarios.
+    keep_paths: keep the base-case price paths (needed only for the dashboard);
+    stress scenarios never keep them since only their final returns are used.
+    stock_symbol: seeds a per-ticker SFC64 stream (reproducible, thread-safe)
+    parallel=False keeps each kernel on the calling thread (screener - its pool spreads tickers)
     """
 
     print(f"\nRunning {num_simulations:,} Monte Carlo simulations...")
-    np.random.seed(42)
+    # crc32 rather than hash() - str hashes change between interpreter runs
+    seed = zlib.crc32(stock_symbol.encode()) if stock_symbol else 42
 
     mu = stats['stock_expected_return']
     base_sigma = stats['stock_volatility']
@@ -87,9 +207,12 @@ def run_monte_carlo(stock_price, stats, days_to_simulate, num_simulations):
     # Volatility stress ladder
     vol_multipliers = [1.0, 1.25, 1.5]
 
+    # Independent child stream per stress scenario
+    streams = np.random.SeedSequence(seed).spawn(len(vol_multipliers))
+
     results = {}
 
-    for multiplier in vol_multipliers:
+    for multiplier, stream in zip(vol_multipliers, streams):
         sigma = base_sigma * multiplier
 
         print(f"\n  → Volatility Stress: {multiplier:.2f}x ({sigma*100:.2f}%)")
@@ -103,18 +226,24 @@ def run_monte_carlo(stock_price, stats, days_to_simulate, num_simulations):
             jump_prob=0.02,       # 2% daily jump probability
             jump_magnitude=-0.04, # -4% shock
             df=5,
-            lambda_=0.94
+            lambda_=0.94,
+            return_paths=keep_paths and multiplier == 1.0,
+            rng=np.random.Generator(np.random.SFC64(stream)),
+            parallel=parallel
         )
 
+        # Sorted once here - percentiles, CVaR and risk state index into it
+        sorted_returns = np.sort(final_returns)
+
         results[multiplier] = {
             "stock_paths": paths,
             "stock_final_prices": final_prices,
-            "stock_final_returns": final_returns
+            "stock_final_returns": final_returns,
+            "stock_sorted_returns": sorted_returns
         }
 
         # Quick tail metrics
-        p5 = np.percentile(final_returns, 5)
-        p1 = np.percentile(final_returns, 1)
+        p5, p1 = percentile_sorted(sorted_returns, [5, 1])
 
         print(f"     5th percentile return:  {p5:.2f}%")
         print(f"     1st percentile return:  {p1:.2f}%")
@@ -126,5 +255,6 @@ def run_monte_carlo(stock_price, stats, days_to_simulate, num_simulations):
         "stock_paths": base_case["stock_paths"],
         "stock_final_prices": base_case["stock_final_prices"],
         "stock_final_returns": base_case["stock_final_returns"],
+        "stock_sorted_returns": base_case["stock_sorted_returns"],
         "stress_results": results
     }
@@ -1,6 +1,35 @@
 """Statistics calculations"""
 import numpy as np
-import pandas as pd
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True, nogil=True)
+    def _welford(arr):
+        """Single-pass, numerically stable mean and sample std (ddof=1)"""
+        count = 0
+        mean = 0.0
+        m2 = 0.0
+        for x in arr:
+            count += 1
+            delta = x - mean
+            mean += delta / count
+            m2 += delta * (x - mean)
+        
+        if count < 2:
+            return mean, np.nan
+        return mean, np.sqrt(m2 / (count - 1))
+else:
+    def _welford(arr):
+        """NumPy fallback - same mean and sample std (ddof=1)"""
+        if len(arr) < 2:
+            return (arr.mean() if len(arr) else 0.0), np.nan
+        return arr.mean(), arr.std(ddof=1)
 
 def calculate_statistics(stock_data, historical_window, stock_symbol, risk_free_rate=0.042):
     """
@@ -8,10 +37,12 @@ def calculate_statistics(stock_data, historical_window, stock_symbol, risk_free_
     """
     print("\nCalculating statistics...")
     
-    stock_prices = stock_data['Close'].iloc[-historical_window:]
-    stock_returns = stock_prices.pct_change().dropna()
+    closes = stock_data['Close'].to_numpy(dtype=np.float64)[-historical_window:]
+    closes = closes[~np.isnan(closes)]
+    stock_returns = np.diff(closes) / closes[:-1]
     
-    stock_volatility = stock_returns.std() * np.sqrt(252)
+    _, returns_std = _welford(stock_returns)
+    stock_volatility = float(returns_std * np.sqrt(252))
     stock_expected_return = risk_free_rate  # Use risk-free proxy
     
     print(f"  {stock_symbol} volatility: {stock_volatility*100:.2f}%")
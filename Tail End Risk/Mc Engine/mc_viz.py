@@ -1,22 +1,60 @@
 """Enhanced Visualization functions — Full Risk Dashboard"""
 
 import numpy as np
-import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 from datetime import datetime
-from pathlib import Path
+
+from mc_cache import OUTPUT_DIR
+from mc_percentiles import batched_quantile, percentile_sorted
+
+try:
+    from fast_histogram import histogram1d
+    FAST_HISTOGRAM_AVAILABLE = True
+except ImportError:
+    FAST_HISTOGRAM_AVAILABLE = False
+
+DASHBOARD_DPI = 150          # 2700x3000 px - plenty on screen, a quarter of the 300 dpi pixels
+MAX_DISPLAY_PATHS = 50_000   # Percentile bands converge well before this
+PATH_PERCENTILES = [5, 25, 50, 75, 95]
+
+_RNG = np.random.default_rng(0)   # PCG64, shared by all display resampling
+_DIR_READY = False           # Output dir is created once per process
 
 
 # ==========================================================
 # MAIN ENTRY
 # ==========================================================
 
-def create_visualization(data):
+def create_visualization(data, timestamp=None, display_subsample=MAX_DISPLAY_PATHS):
+    """
+    Pass one timestamp when rendering a batch of symbols to share it across files
+    display_subsample caps the paths used for the price bands (lower = faster, noisier)
+    """
 
     print("\nGenerating enhanced risk dashboard...")
 
-    fig = plt.figure(figsize=(18, 20))
+    _ensure_dirs()
+
+    # Everything the panels derive from the raw arrays is computed once here
+    sorted_returns = _sorted_returns(data)
+    data["_derived"] = {
+        "sorted_returns": sorted_returns,
+        "path_bands": _path_bands(data["stock_paths"], data["stock_price"], display_subsample),
+        "pcts_1_5_50": percentile_sorted(sorted_returns, [1, 5, 50]),
+        "stress_tails": _stress_tails(data.get("stress_results")),
+    }
+
+    # Plain Agg figure - no pyplot state machine or GUI backend for a PNG-only render
+    fig = Figure(figsize=(18, 20))
+    FigureCanvasAgg(fig)
+    # Fixed margins make the default bbox already tight - no second layout pass on save
     gs = fig.add_gridspec(
         4, 2,
+        left=0.05,
+        right=0.97,
+        top=0.94,
+        bottom=0.03,
         hspace=0.5,
         wspace=0.3
     )
@@ -58,54 +96,172 @@ def create_visualization(data):
     _plot_risk_state_panel(ax8, data)
 
     # Save
-    output_dir = Path(
-        '/Users/jazzhashzzz/Documents/Market_Analysis_files/output/monte_carlo_risk_engine'
-    )
-    output_dir.mkdir(parents=True, exist_ok=True)
-
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    if timestamp is None:
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     filename = f'monte_carlo_dashboard_{data["stock_symbol"]}_{timestamp}.png'
-    output_path = output_dir / filename
+    output_path = OUTPUT_DIR / filename
 
-    plt.savefig(output_path, dpi=300, bbox_inches='tight')
-    plt.close()
+    # PNG encode dominates the save; zlib level 1 roughly halves it for ~2x the file size
+    fig.savefig(output_path, dpi=DASHBOARD_DPI, pil_kwargs={'compress_level': 1})
 
     return str(output_path)
 
 
+def _ensure_dirs():
+    """Create OUTPUT_DIR on first use only"""
+    global _DIR_READY
+    if not _DIR_READY:
+        OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+        _DIR_READY = True
+
+
+def _sorted_returns(result):
+    """Reuse the engine's sorted returns when present, otherwise sort here"""
+    sorted_returns = result.get("stock_sorted_returns")
+    if sorted_returns is None:
+        sorted_returns = np.sort(result["stock_final_returns"])
+    return sorted_returns
+
+
+def _regime_tail(result):
+    """(p1, p5, min, max) for one stress regime, or None if it has no returns"""
+    returns = result.get("stock_final_returns")
+    if returns is None or len(returns) == 0:
+        return None
+
+    sorted_returns = result.get("stock_sorted_returns")
+    if sorted_returns is not None:
+        p1, p5 = percentile_sorted(sorted_returns, [1, 5])
+        return p1, p5, sorted_returns[0], sorted_returns[-1]
+
+    p1, p5 = np.percentile(returns, [1, 5])
+    return p1, p5, returns.min(), returns.max()
+
+
+def _stress_tails(stress_results):
+    """Per-regime tail stats - O(1) lookups into each regime's sorted returns"""
+    if not stress_results:
+        return {}
+
+    tails = {mult: _regime_tail(result) for mult, result in stress_results.items()}
+    return {mult: tail for mult, tail in tails.items() if tail is not None}
+
+
+def _histogram(values, bins, lo, hi):
+    """Counts and edges for uniform bins over [lo, hi]"""
+    if hi <= lo:
+        lo, hi = lo - 0.5, hi + 0.5
+
+    if FAST_HISTOGRAM_AVAILABLE:
+        # histogram1d excludes the upper edge; nudge it so the max lands in the last bin
+        counts = histogram1d(values, bins=bins, range=(lo, np.nextafter(hi, np.inf)))
+    else:
+        # Uniform bins: direct index arithmetic + bincount, no searchsorted over edges
+        idx = ((values - lo) * (bins / (hi - lo))).astype(np.int64)
+        np.clip(idx, 0, bins - 1, out=idx)
+        counts = np.bincount(idx, minlength=bins)
+
+    return counts, np.linspace(lo, hi, bins + 1)
+
+
+def _text_table(ax, header, rows, fontsize=10):
+    """
+    Fixed-width table drawn as one monospace text artist
+    Far cheaper to lay out and draw than a matplotlib Table of per-cell artists
+    """
+    widths = [max(len(str(r[i])) for r in [header] + rows) for i in range(len(header))]
+    lines = ["  ".join(str(c).center(w) for c, w in zip(r, widths)) for r in [header] + rows]
+    lines.insert(1, "  ".join("-" * w for w in widths))
+
+    ax.text(
+        0.5, 0.5,
+        "\n".join(lines),
+        family='monospace',
+        fontsize=fontsize,
+        linespacing=1.8,
+        ha='center',
+        va='center',
+        transform=ax.transAxes
+    )
+
+
+def _style_axes(ax, title, xlabel, ylabel, legend=True, loc='upper right'):
+    """
+    Shared chart styling: labels in one Artist.set, then grid and legend once each
+    Legend position is fixed per chart - loc='best' samples the data to place it
+    """
+    ax.set(xlabel=xlabel, ylabel=ylabel)
+    ax.set_title(title, fontweight='bold')
+    ax.grid(True, alpha=0.3)
+    if legend:
+        ax.legend(fontsize=8, loc=loc)
+
+
+def _build_table(ax, cell_text, col_labels, cell_colors, header_color, fontsize=10):
+    """
+    matplotlib Table with every cell color set at construction and a fixed bbox
+    Avoids per-cell set_facecolor invalidations and the scale() re-layout
+    """
+    table = ax.table(
+        cellText=cell_text,
+        colLabels=col_labels,
+        cellColours=cell_colors,
+        colColours=[header_color] * len(col_labels),
+        cellLoc='center',
+        bbox=[0, 0, 1, 1]
+    )
+
+    table.auto_set_font_size(False)
+    table.set_fontsize(fontsize)
+
+    for j in range(len(col_labels)):
+        table[(0, j)].set_text_props(weight='bold', color='white')
+
+    return table
+
+
 # ==========================================================
 # PRICE PATHS
 # ==========================================================
 
+def _path_bands(paths, starting_price, display_subsample=MAX_DISPLAY_PATHS):
+    """Normalized (price = 100) percentile bands per day, shape (len(PATH_PERCENTILES), days)"""
+
+    # Bands only need a sample of paths - subsample before normalizing
+    if paths.shape[1] > display_subsample:
+        idx = _RNG.choice(paths.shape[1], display_subsample, replace=False)
+        paths = paths[:, idx]
+
+    paths = paths.astype(np.float32, copy=False)
+
+    # One partition per day for all five bands, normalization fused in - float32 halves the bytes
+    return batched_quantile(paths, np.asarray(PATH_PERCENTILES) / 100, scale=100.0 / starting_price)
+
+
 def _plot_price_paths(ax, data):
 
-    paths = data["stock_paths"]
-    starting_price = data["stock_price"]
     days = data["days_to_simulate"]
+    pcts = data["_derived"]["path_bands"]
 
-    normalized = (paths / starting_price) * 100
-    percentiles = [5, 25, 50, 75, 95]
-
-    for p in percentiles:
+    for i, p in enumerate(PATH_PERCENTILES):
         ax.plot(
-            np.percentile(normalized, p, axis=1),
+            pcts[i],
             linewidth=2,
             label=f'{p}th'
         )
 
+    # Dense band is rasterized behind the lines; text and lines stay vector
     ax.fill_between(
         range(days),
-        np.percentile(normalized, 5, axis=1),
-        np.percentile(normalized, 95, axis=1),
-        alpha=0.2
+        pcts[0],
+        pcts[4],
+        alpha=0.2,
+        rasterized=True,
+        zorder=0
     )
 
     ax.axhline(100, linewidth=2)
-    ax.set_title("Price Path Percentiles", fontweight='bold')
-    ax.set_xlabel("Trading Days")
-    ax.set_ylabel("Normalized Price")
-    ax.legend(fontsize=8)
-    ax.grid(True, alpha=0.3)
+    _style_axes(ax, "Price Path Percentiles", "Trading Days", "Normalized Price", loc='lower left')
 
 
 # ==========================================================
@@ -116,21 +272,18 @@ def _plot_return_distribution(ax, data):
 
     returns = data["stock_final_returns"]
 
-    ax.hist(returns, bins=100, alpha=0.7)
+    derived = data["_derived"]
+    sorted_returns = derived["sorted_returns"]
+    counts, edges = _histogram(returns, 100, sorted_returns[0], sorted_returns[-1])
+    ax.stairs(counts, edges, fill=True, alpha=0.7)
 
-    p5 = np.percentile(returns, 5)
-    p1 = np.percentile(returns, 1)
-    median = np.percentile(returns, 50)
+    p1, p5, median = derived["pcts_1_5_50"]
 
     ax.axvline(p5, linestyle='--', linewidth=2, label="5th")
     ax.axvline(p1, linestyle='--', linewidth=2, label="1st")
     ax.axvline(median, linestyle='--', linewidth=2, label="Median")
 
-    ax.set_title("Final Return Distribution (Base)", fontweight='bold')
-    ax.set_xlabel("Return (%)")
-    ax.set_ylabel("Frequency")
-    ax.legend(fontsize=8)
-    ax.grid(True, alpha=0.3)
+    _style_axes(ax, "Final Return Distribution (Base)", "Return (%)", "Frequency")
 
 
 # ==========================================================
@@ -141,24 +294,14 @@ def _plot_percentile_table(ax, data):
 
     ax.axis('off')
 
-    table_data = []
     df = data["stock_percentiles"]
 
-    for _, row in df.iterrows():
-        p = int(row["percentile"])
-        r = row["return"]
-        table_data.append([f"{p}th", f"{r:.2f}%"])
-
-    table = ax.table(
-        cellText=table_data,
-        colLabels=["Percentile", "Return"],
-        loc='center',
-        cellLoc='center'
-    )
+    table_data = [
+        [f"{int(p)}th", f"{r:.2f}%"]
+        for p, r in df[["percentile", "return"]].to_numpy()
+    ]
 
-    table.auto_set_font_size(False)
-    table.set_fontsize(10)
-    table.scale(1, 2)
+    _text_table(ax, ["Percentile", "Return"], table_data, fontsize=10)
 
     ax.set_title("Return Percentiles", fontweight='bold')
 
@@ -182,16 +325,7 @@ def _plot_statistical_summary(ax, data):
         ["CVaR 99%", f'{cvar["cvar_99"]:.2f}%'],
     ]
 
-    table = ax.table(
-        cellText=table_data,
-        colLabels=["Metric", "Value"],
-        loc='center',
-        cellLoc='center'
-    )
-
-    table.auto_set_font_size(False)
-    table.set_fontsize(10)
-    table.scale(1, 2)
+    _text_table(ax, ["Metric", "Value"], table_data, fontsize=10)
 
     ax.set_title("Risk Summary", fontweight='bold')
 
@@ -215,30 +349,30 @@ def _plot_stress_distributions(ax, data):
         ax.set_title("Stress Regime Distributions", fontweight='bold')
         return
 
+    tails = data["_derived"]["stress_tails"]
     plotted = False
 
-    for mult, result in stress_results.items():
+    # One range for every regime (from the min/max already in hand) so the bins line up
+    if tails:
+        lo = min(t[2] for t in tails.values())
+        hi = max(t[3] for t in tails.values())
 
-        returns = result.get("stock_final_returns")
+    for mult, result in stress_results.items():
 
-        if returns is None or len(returns) == 0:
+        if mult not in tails:
             continue
 
-        ax.hist(
-            returns,
-            bins=80,
+        counts, edges = _histogram(result["stock_final_returns"], 80, lo, hi)
+        ax.stairs(
+            counts,
+            edges,
+            fill=True,
             alpha=0.4,
             label=f"{mult}x Vol"
         )
         plotted = True
 
-    if plotted:
-        ax.legend(fontsize=8)
-
-    ax.set_title("Stress Regime Distributions", fontweight='bold')
-    ax.set_xlabel("Return (%)")
-    ax.set_ylabel("Frequency")
-    ax.grid(True, alpha=0.3)
+    _style_axes(ax, "Stress Regime Distributions", "Return (%)", "Frequency", legend=plotted)
 
 
 
@@ -266,15 +400,7 @@ def _plot_stress_tail_shift(ax, data):
 
     rows = []
 
-    for mult, result in stress_results.items():
-
-        returns = result.get("stock_final_returns")
-
-        if returns is None or len(returns) == 0:
-            continue
-
-        p5 = np.percentile(returns, 5)
-        p1 = np.percentile(returns, 1)
+    for mult, (p1, p5, _, _) in data["_derived"]["stress_tails"].items():
 
         rows.append([
             f"{mult}x",
@@ -294,16 +420,7 @@ def _plot_stress_tail_shift(ax, data):
         ax.set_title("Tail Shift Under Stress", fontweight='bold')
         return
 
-    table = ax.table(
-        cellText=rows,
-        colLabels=["Vol Regime", "5th %", "1st %"],
-        loc='center',
-        cellLoc='center'
-    )
-
-    table.auto_set_font_size(False)
-    table.set_fontsize(10)
-    table.scale(1, 2)
+    _text_table(ax, ["Vol Regime", "5th %", "1st %"], rows, fontsize=10)
 
     ax.set_title("Tail Shift Under Stress", fontweight='bold')
 
@@ -317,35 +434,21 @@ def _plot_strike_guide(ax, data):
     ax.axis('off')
 
     current_price = data["stock_price"]
-    returns = data["stock_final_returns"]
+    sorted_returns = data["_derived"]["sorted_returns"]
     df = data["stock_percentiles"]
 
-    table_data = []
-
-    for _, row in df.iterrows():
-        p = int(row["percentile"])
-        r = row["return"]
-
-        strike = current_price * (1 + r / 100)
-        prob_below = (returns <= r).mean() * 100
+    ps = df["percentile"].to_numpy(int)
+    rs = df["return"].to_numpy()
 
-        table_data.append([
-            f"{p}th",
-            f"{r:.1f}%",
-            f"${strike:.2f}",
-            f"{prob_below:.1f}%"
-        ])
+    strikes = current_price * (1 + rs / 100)
+    probs = np.searchsorted(sorted_returns, rs, side='right') / sorted_returns.size * 100
 
-    table = ax.table(
-        cellText=table_data,
-        colLabels=["Percentile", "Return", "Strike", "Prob Finish Below"],
-        loc='center',
-        cellLoc='center'
-    )
+    table_data = [
+        [f"{p}th", f"{r:.1f}%", f"${s:.2f}", f"{pb:.1f}%"]
+        for p, r, s, pb in zip(ps, rs, strikes, probs)
+    ]
 
-    table.auto_set_font_size(False)
-    table.set_fontsize(9)
-    table.scale(1, 2)
+    _text_table(ax, ["Percentile", "Return", "Strike", "Prob Finish Below"], table_data, fontsize=9)
 
     ax.set_title("Strike Probability Guide", fontweight='bold')
 
@@ -368,11 +471,11 @@ def _plot_risk_state_panel(ax, data):
 
     # Classify regime from composite score
     if score >= 65:
-        regime = "Elevated"
+        regime, regime_color = "Elevated", '#ffcccc'
     elif score >= 35:
-        regime = "Neutral"
+        regime, regime_color = "Neutral", '#ffffcc'
     else:
-        regime = "Compressed"
+        regime, regime_color = "Compressed", '#ccffcc'
 
     rows = [
         ["Risk State Score", f"{score:.1f} / 100"],
@@ -384,32 +487,11 @@ def _plot_risk_state_panel(ax, data):
         ["Distribution Width (p95-p5)", f"{dist_width:.1f}%"],
     ]
 
-    table = ax.table(
-        cellText=rows,
-        colLabels=["Component", "Value"],
-        loc='center',
-        cellLoc='center'
-    )
-
-    table.auto_set_font_size(False)
-    table.set_fontsize(9)
-    table.scale(1, 2.2)
-
-    # Header
-    for j in range(2):
-        table[(0, j)].set_facecolor('#4CAF50')
-        table[(0, j)].set_text_props(weight='bold', color='white')
+    # Score and regime values are shaded by regime
+    colors = [['white', 'white'] for _ in rows]
+    colors[0][1] = colors[1][1] = regime_color
 
-    # Color the score row based on regime
-    if score >= 65:
-        table[(1, 1)].set_facecolor('#ffcccc')
-        table[(2, 1)].set_facecolor('#ffcccc')
-    elif score >= 35:
-        table[(1, 1)].set_facecolor('#ffffcc')
-        table[(2, 1)].set_facecolor('#ffffcc')
-    else:
-        table[(1, 1)].set_facecolor('#ccffcc')
-        table[(2, 1)].set_facecolor('#ccffcc')
+    table = _build_table(ax, rows, ["Component", "Value"], colors, '#4CAF50', fontsize=9)
 
     table[(1, 0)].set_text_props(weight='bold')
     table[(1, 1)].set_text_props(weight='bold', size=11)
@@ -1,15 +1,21 @@
 """Monte Carlo Risk Analysis Engine - uses split modules"""
-from mc_data import download_data, set_starting_prices
+import numpy as np
+
+from mc_data import download_data, use_preloaded_data, set_starting_prices
 from mc_stats import calculate_statistics
 from mc_simulation import run_monte_carlo
-from mc_percentiles import calculate_percentiles, calculate_cvar
+from mc_percentiles import calculate_percentiles, calculate_cvar, percentile_rank
 from mc_viz import create_visualization
 from mc_risk_state import calculate_risk_state_score
 
 class MonteCarloRiskEngine:
     def __init__(self, stock_symbol, days_to_simulate,
                  num_simulations, historical_window,
-                 custom_stock_price=None):
+                 custom_stock_price=None, keep_paths=True, preloaded_history=None,
+                 parallel=True):
+        # keep_paths=False skips storing price paths (screener use - no dashboard)
+        # parallel=False runs the MC kernel on the calling thread (screener worker threads)
+        # preloaded_history: daily bars the caller already downloaded (skips download_data)
         
         self.stock_symbol = stock_symbol
         self.days_to_simulate = days_to_simulate
@@ -18,7 +24,10 @@ class MonteCarloRiskEngine:
         self.custom_stock_price = custom_stock_price
         
         # Download data
-        self.stock_data = download_data(stock_symbol, historical_window)
+        if preloaded_history is not None:
+            self.stock_data = use_preloaded_data(preloaded_history, stock_symbol)
+        else:
+            self.stock_data = download_data(stock_symbol, historical_window)
         
         # Set prices
         self.stock_price = set_starting_prices(self.stock_data, stock_symbol, custom_stock_price)
@@ -34,17 +43,23 @@ class MonteCarloRiskEngine:
         self.stock_expected_return = stats['stock_expected_return']
         
         # Run simulation
-        sim_results = run_monte_carlo(self.stock_price, stats, days_to_simulate, num_simulations)
+        sim_results = run_monte_carlo(self.stock_price, stats, days_to_simulate, num_simulations,
+                                      keep_paths=keep_paths, stock_symbol=stock_symbol,
+                                      parallel=parallel)
         self.stock_paths = sim_results['stock_paths']
         self.stock_final_prices = sim_results['stock_final_prices']
         self.stock_final_returns = sim_results['stock_final_returns']
+        self.stock_sorted_returns = sim_results['stock_sorted_returns']
+        self.stock_final_prices_sorted = np.sort(self.stock_final_prices)
         self.stress_results = sim_results["stress_results"]
 
         # Calculate percentiles
-        self.stock_percentiles = calculate_percentiles(self.stock_final_returns, self.stock_final_prices)
+        self.stock_percentiles = calculate_percentiles(self.stock_final_returns, self.stock_final_prices,
+                                                       sorted_returns=self.stock_sorted_returns,
+                                                       sorted_prices=self.stock_final_prices_sorted)
         
         # Calculate CVaR
-        self.stock_cvar = calculate_cvar(self.stock_final_returns)
+        self.stock_cvar = calculate_cvar(self.stock_final_returns, sorted_returns=self.stock_sorted_returns)
         
         print(f"\nRisk Metrics:")
         print(f"  VaR (95%):  {self.stock_cvar['var_95']:.2f}% (5th percentile)")
@@ -58,7 +73,8 @@ class MonteCarloRiskEngine:
         self.risk_state = calculate_risk_state_score(
             self.stock_data,
             self.stock_final_returns,
-            self.stock_cvar
+            self.stock_cvar,
+            sorted_returns=self.stock_sorted_returns
         )
 
         print("\nRisk State Components:")
@@ -69,7 +85,11 @@ class MonteCarloRiskEngine:
         print(f"\n  Risk State Score:     {self.risk_state['risk_state_score']:.1f}/100")
 
     
-    def run_full_analysis(self, target_price_to_check=None):
+    def price_percentile_rank(self, target_prices):
+        """Percent of simulated final prices at or below each target (scalar or array)"""
+        return percentile_rank(self.stock_final_prices_sorted, target_prices)
+
+    def run_full_analysis(self, target_price_to_check=None, timestamp=None):
         """Generate visualization"""
         data = {
             "stock_symbol": self.stock_symbol,
@@ -78,6 +98,7 @@ class MonteCarloRiskEngine:
             "stock_paths": self.stock_paths,
             "stock_price": self.stock_price,
             "stock_final_returns": self.stock_final_returns,
+            "stock_sorted_returns": self.stock_sorted_returns,
             "stock_percentiles": self.stock_percentiles,
             "stock_data": self.stock_data,
             "historical_window": self.historical_window,
@@ -90,4 +111,4 @@ class MonteCarloRiskEngine:
             "risk_state": self.risk_state
         }
         
-        return create_visualization(data)
\ No newline at end of file
+        return create_visualization(data, timestamp=timestamp)
\ No newline at end of file
@@ -10,7 +10,8 @@ from pathlib import Path
 mc_engine_path = Path(__file__).parent / "Mc Engine"
 sys.path.insert(0, str(mc_engine_path))
 
-from monte_carlo_risk_engine import MonteCarloRiskEngine
+from mc_cache import results_path, load_results, save_results
+from mc_percentiles import percentile_rank as rank_in_sorted
 # ============================================================================
 # USER INPUTS - MODIFY THESE PARAMETERS
 # ============================================================================
@@ -66,20 +67,35 @@ if TARGET_PRICE_TO_CHECK is not None:
 
 print("="*80)
 
-# Initialize the engine
-engine = MonteCarloRiskEngine(
-    stock_symbol=STOCK_SYMBOL,
-    days_to_simulate=DAYS_TO_SIMULATE,
-    num_simulations=NUM_SIMULATIONS,
-    historical_window=HISTORICAL_WINDOW,
-    custom_stock_price=CUSTOM_STOCK_PRICE,
-)
+# Same stock/parameters already simulated today? Then only the target check below reruns
+RESULTS_CACHE = results_path(STOCK_SYMBOL, DAYS_TO_SIMULATE, NUM_SIMULATIONS,
+                             HISTORICAL_WINDOW, CUSTOM_STOCK_PRICE)
+cached = load_results(RESULTS_CACHE)
+
+if cached is None:
+    # Engine import pulls in yfinance/numba/matplotlib - only needed when simulating
+    from monte_carlo_risk_engine import MonteCarloRiskEngine
+    
+    # Initialize the engine
+    engine = MonteCarloRiskEngine(
+        stock_symbol=STOCK_SYMBOL,
+        days_to_simulate=DAYS_TO_SIMULATE,
+        num_simulations=NUM_SIMULATIONS,
+        historical_window=HISTORICAL_WINDOW,
+        custom_stock_price=CUSTOM_STOCK_PRICE,
+    )
+else:
+    print(f"\nReusing today's simulation: {RESULTS_CACHE.name}")
 
 # Run the full analysis
 try:
-    viz_path = engine.run_full_analysis(
-    target_price_to_check=TARGET_PRICE_TO_CHECK
-)
+    if cached is None:
+        viz_path = engine.run_full_analysis(target_price_to_check=TARGET_PRICE_TO_CHECK)
+        sorted_prices = engine.stock_final_prices_sorted
+        stock_percentiles = engine.stock_percentiles
+        save_results(RESULTS_CACHE, sorted_prices, stock_percentiles, viz_path)
+    else:
+        sorted_prices, stock_percentiles, viz_path = cached
     
     # TARGET PRICE ANALYSIS
     if TARGET_PRICE_TO_CHECK is not None:
@@ -87,8 +103,7 @@ try:
         print("TARGET PRICE ANALYSIS")
         print(f"{'='*80}")
         
-        stock_final_prices = engine.stock_final_prices
-        percentile_rank = (stock_final_prices <= TARGET_PRICE_TO_CHECK).sum() / len(stock_final_prices) * 100
+        percentile_rank = rank_in_sorted(sorted_prices, TARGET_PRICE_TO_CHECK)
         
         print(f"\nTarget Price: ${TARGET_PRICE_TO_CHECK:.2f}")
         print(f"Percentile Rank: {percentile_rank:.1f}th percentile")
@@ -121,11 +136,8 @@ try:
         
         # Distance from percentile boundaries
         print(f"\nPercentile boundaries for reference:")
-        p1 = engine.stock_percentiles[engine.stock_percentiles['percentile'] == 1]['price'].values[0]
-        p5 = engine.stock_percentiles[engine.stock_percentiles['percentile'] == 5]['price'].values[0]
-        p10 = engine.stock_percentiles[engine.stock_percentiles['percentile'] == 10]['price'].values[0]
-        p25 = engine.stock_percentiles[engine.stock_percentiles['percentile'] == 25]['price'].values[0]
-        p50 = engine.stock_percentiles[engine.stock_percentiles['percentile'] == 50]['price'].values[0]
+        price_by_pct = stock_percentiles.set_index('percentile')['price']
+        p1, p5, p10, p25, p50 = price_by_pct.reindex([1, 5, 10, 25, 50]).to_numpy()
         
         print(f"  1st percentile:  ${p1:.2f}")
         print(f"  5th percentile:  ${p5:.2f}")